@@ -1,10 +1,14 @@
-import numpy as np # type: ignore
-from sklearn.gaussian_process import GaussianProcessRegressor # type: ignore
-from sklearn.gaussian_process.kernels import Matern # type: ignore
-from scipy.stats import norm # type: ignore
+import sys
+import time
+import argparse
 import warnings
+from itertools import repeat
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np # type: ignore
+from surrogate import IncrementalGP # GP with O(n^2) appends between hyperparameter refits
 
-warnings.filterwarnings("ignore")
+# scipy / sklearn are imported inside the methods that need them, so importing
+# this module (e.g. from stability.py) stays cheap
 
 class RealPhysicsOptimizer:
     def __init__(self):
@@ -76,7 +80,48 @@ class RealPhysicsOptimizer:
         # Add slight experimental noise
         return final_voltage + np.random.normal(0, 0.02)
 
+    def run_experiments(self, X, rng=None, noise=0.02):
+        """
+        Vectorized run_experiment for an (n, 3) array of [x_Cl, x_Br, x_I] rows,
+        with the same float64 operations, so noise-free values match it exactly.
+        Noise (std `noise`, 0 = ground truth) is only added to doped, soluble
+        rows, like the scalar version; `rng` is a seed or np.random.Generator
+        (None uses the global np.random stream, as run_experiment does).
+        """
+        X = np.asarray(X, dtype=np.float64).reshape(-1, 3)
+        x_Cl, x_Br, x_I = X[:, 0], X[:, 1], X[:, 2]
+        total_doping = X.sum(axis=1)
+
+        # 1. SOLUBILITY CHECK
+        insoluble = total_doping > 1.0
+        pure = ~insoluble & (total_doping < 0.01)
+
+        # 2. VOLTAGE BOOST
+        d_Cl = self.X_Cl - self.X_S
+        d_Br = self.X_Br - self.X_S
+        d_I  = self.X_I  - self.X_S
+        voltage_gain = 1.5 * (x_Cl * d_Cl + x_Br * d_Br + x_I * d_I)
+
+        # 3. LATTICE STRAIN PENALTY (same tiers as run_experiment)
+        strain_Cl = (self.R_Cl - self.R_S)**2
+        strain_Br = (self.R_Br - self.R_S)**2
+        strain_I  = (self.R_I  - self.R_S)**2
+        total_strain = (x_Cl * strain_Cl) + (x_Br * strain_Br) + (x_I * strain_I)
+        strain_penalty = np.where(total_strain > 300.0, 2.0, np.where(total_strain > 100.0, 0.001 * total_strain, 0.0))
+
+        # 4. FINAL CALCULATION
+        voltage = self.base_voltage + voltage_gain - strain_penalty
+        doped = ~insoluble & ~pure
+        if noise:
+            rng = np.random if rng is None else np.random.default_rng(rng)
+            voltage[doped] += rng.normal(0, noise, int(doped.sum()))
+        voltage[insoluble] = 0.0
+        voltage[pure] = self.base_voltage
+        return voltage
+
     def expected_improvement(self, X, model, y_best, xi=0.01):
+        from scipy.stats import norm # type: ignore
+
         mu, sigma = model.predict(X, return_std=True)
         with np.errstate(divide='warn'):
             imp = mu - y_best - xi
@@ -85,7 +130,76 @@ class RealPhysicsOptimizer:
             ei[sigma == 0.0] = 0.0
         return ei
 
-    def optimize(self, iterations=20):
+    def maximize_ei(self, candidates, model, y_best, starts=5, incumbents=None):
+        """
+        EI argmax over `candidates`, then multi-start SLSQP on EI inside the
+        feasible region (x >= 0, sum(x) <= 1) from the `starts` best candidates
+        and from jittered copies of `incumbents` (EI is flat at an observed
+        point itself). Returns the best point found; starts=0 is the plain argmax.
+        """
+        ei = self.expected_improvement(candidates, model, y_best)
+        best_x, best_ei = candidates[np.argmax(ei)], np.max(ei)
+        if starts == 0:
+            return best_x
+        from scipy.optimize import minimize # type: ignore
+
+        x0s = candidates[np.argsort(ei)[-starts:]]
+        if incumbents is not None and len(incumbents):
+            x0s = np.vstack([x0s, project_to_simplex(incumbents + np.random.normal(0, 0.02, incumbents.shape))])
+        scale = max(best_ei, 1e-12) # SLSQP tolerances are absolute; EI can be ~1e-6
+        feasible = {'type': 'ineq', 'fun': lambda x: 1.0 - np.sum(x), 'jac': lambda x: -np.ones_like(x)}
+        for x0 in x0s:
+            res = minimize(lambda x: -self.expected_improvement(x[None, :], model, y_best)[0] / scale, x0,
+                           method='SLSQP', bounds=[(0.0, 1.0)] * len(x0), constraints=[feasible])
+            x = project_to_simplex(res.x[None, :])[0]
+            x_ei = self.expected_improvement(x[None, :], model, y_best)[0]
+            if x_ei > best_ei:
+                best_x, best_ei = x, x_ei
+        return best_x
+
+    def propose_batch(self, candidates, model, Y_sample, q, strategy="believer", starts=0, incumbents=None):
+        """
+        Picks q candidates for one round of parallel experiments. After each EI
+        argmax the surrogate is conditioned on a pretend result at that point,
+        which kills EI there and nearby, before choosing the next one:
+        "believer" (Kriging believer) pretends the GP mean, "liar" (constant
+        liar) pretends the worst voltage seen so far, which spreads the batch wider.
+        `starts` / `incumbents` refine each pick, see maximize_ei.
+        """
+        y_best = np.max(Y_sample)
+        batch = []
+        for _ in range(q):
+            x = self.maximize_ei(candidates, model, y_best, starts, incumbents)
+            batch.append(x)
+            if len(batch) < q:
+                y_pretend = model.predict(x[None, :])[0] if strategy == "believer" else np.min(Y_sample)
+                model = model.fantasize(x, y_pretend)
+                # A believed result above the incumbent becomes the incumbent; otherwise
+                # EI at x stays mu - y_best > 0 and the next pick is x again
+                y_best = max(y_best, y_pretend)
+        return np.array(batch)
+
+    def optimize(self, iterations=20, refit_every=10, drift_tol=0.5, n_restarts=10,
+                 batch_size=1, strategy="believer", workers=None,
+                 candidates="simplex", n_candidates=1024, refine_starts=5):
+        """
+        GP + EI loop. The surrogate refits its kernel hyperparameters (with
+        n_restarts optimizer restarts) every `refit_every` experiments or when
+        its log marginal likelihood per point drifts by more than `drift_tol`;
+        other iterations only append the new point (see IncrementalGP).
+        refit_every=1 reproduces a full refit per iteration.
+        With batch_size > 1, each round proposes batch_size compositions
+        (see propose_batch) and runs them concurrently in a process pool of
+        `workers` processes (default: one per experiment in the batch).
+        `iterations` is the total number of experiments either way.
+        candidates="simplex" draws n_candidates fresh Sobol points on the
+        feasible simplex every round and refines the EI argmax from
+        refine_starts candidates plus the 3 best compositions so far
+        (see maximize_ei); "box" is the original fixed 2000-point pool in
+        [0, 1]^3, most of which is insoluble.
+        """
+        warnings.filterwarnings("ignore") # GP convergence chatter
+
         print(f"{'Iter':<5} | {'Cl':<6} {'Br':<6} {'I':<6} | {'Voltage':<10} | {'Physics Note'}")
         print("-" * 65)
         
@@ -95,37 +209,51 @@ class RealPhysicsOptimizer:
             pt = np.random.uniform(0, 0.4, 3) 
             if np.sum(pt) <= 1.0: X_sample.append(pt)
         X_sample = np.array(X_sample)
-        Y_sample = np.array([self.run_experiment(x) for x in X_sample])
+        Y_sample = self.run_experiments(X_sample)
         
         # GP Loop
-        kernel = Matern(length_scale=1.0, nu=2.5)
-        gp = GaussianProcessRegressor(kernel=kernel, n_restarts_optimizer=10, random_state=42)
+        gp = IncrementalGP(refit_every=refit_every, drift_tol=drift_tol, n_restarts=n_restarts, random_state=42)
+        gp.fit(X_sample, Y_sample)
         
-        # Grid Search
-        candidate_pool = np.random.uniform(0, 1.0, (2000, 3))
+        # Candidate Search
+        if candidates == "box":
+            candidate_pool, refine_starts = np.random.uniform(0, 1.0, (2000, 3)), 0
         
-        for i in range(iterations):
-            gp.fit(X_sample, Y_sample)
-            y_best = np.max(Y_sample)
-            
-            ei = self.expected_improvement(candidate_pool, gp, y_best)
-            best_cand_idx = np.argmax(ei)
-            next_x = candidate_pool[best_cand_idx]
-            
-            next_y = self.run_experiment(next_x)
-            
-            # Physics Diagnostics
-            strain_I = (self.R_I - self.R_S)**2
-            current_strain = next_x[0]*9 + next_x[1]*144 + next_x[2]*strain_I
-            
-            note = "Stable"
-            if np.sum(next_x) > 1.0: note = "Insoluble"
-            elif current_strain > 300: note = "High Strain"
-            
-            print(f"{i+1:<5} | {next_x[0]:.2f}   {next_x[1]:.2f}   {next_x[2]:.2f}   | {next_y:<10.4f} | {note}")
-            
-            X_sample = np.vstack((X_sample, next_x))
-            Y_sample = np.append(Y_sample, next_y)
+        pool = None
+        if batch_size > 1 and workers != 1:
+            pool = ProcessPoolExecutor(max_workers=workers or batch_size)
+
+        try:
+            for start in range(0, iterations, batch_size):
+                if candidates == "simplex":
+                    candidate_pool = sample_simplex(n_candidates, seed=np.random.randint(2**31 - 1))
+                incumbents = X_sample[np.argsort(Y_sample)[-3:]] if refine_starts else None
+                batch = self.propose_batch(candidate_pool, gp, Y_sample, min(batch_size, iterations - start),
+                                           strategy, refine_starts, incumbents)
+                if pool is None:
+                    batch_y = [self.run_experiment(x) for x in batch]
+                else:
+                    # Workers would share the parent's RNG state, so each experiment gets its own seed
+                    seeds = np.random.randint(0, 2**31 - 1, len(batch))
+                    batch_y = list(pool.map(_seeded_experiment, repeat(self), batch, seeds))
+
+                for i, (next_x, next_y) in enumerate(zip(batch, batch_y), start=start):
+                    # Physics Diagnostics
+                    strain_I = (self.R_I - self.R_S)**2
+                    current_strain = next_x[0]*9 + next_x[1]*144 + next_x[2]*strain_I
+
+                    note = "Stable"
+                    if np.sum(next_x) > 1.0: note = "Insoluble"
+                    elif current_strain > 300: note = "High Strain"
+
+                    print(f"{i+1:<5} | {next_x[0]:.2f}   {next_x[1]:.2f}   {next_x[2]:.2f}   | {next_y:<10.4f} | {note}")
+
+                    X_sample = np.vstack((X_sample, next_x))
+                    Y_sample = np.append(Y_sample, next_y)
+                    gp.add(next_x, next_y)
+        finally:
+            if pool is not None:
+                pool.shutdown()
             
         best_idx = np.argmax(Y_sample)
         best_x = X_sample[best_idx]
@@ -133,9 +261,125 @@ class RealPhysicsOptimizer:
         print("OPTIMAL COMPOSITION DISCOVERED:")
         print(f"Cl: {best_x[0]:.3f} | Br: {best_x[1]:.3f} | I: {best_x[2]:.3f}")
         print(f"Max Voltage: {Y_sample[best_idx]:.4f} V")
+        print(f"Surrogate hyperparameter fits: {gp.n_refits} ({len(Y_sample)} points)")
         
         return best_x
 
-# Run Real Physics
-optimizer = RealPhysicsOptimizer()
-optimizer.optimize(iterations=100)
\ No newline at end of file
+def sample_simplex(n, dim=3, seed=None):
+    """
+    n scrambled-Sobol points spread uniformly over {x >= 0, sum(x) <= 1} in
+    `dim` dimensions: the gaps between sorted uniforms are a uniform point on
+    the (dim+1)-simplex, and the last gap is the undoped (sulfur) remainder.
+    """
+    from scipy.stats import qmc # type: ignore
+
+    u = np.sort(qmc.Sobol(d=dim, seed=seed).random(n), axis=1)
+    return np.diff(u, axis=1, prepend=0.0)
+
+def simplex_grid(steps):
+    """
+    Every composition with x_i = k_i / steps and sum(x) <= 1, as an (n, 3) array;
+    n = C(steps + 3, 3), e.g. steps=180 gives ~1.0e6 points. Points on the
+    face sum to exactly 1.0.
+    """
+    k = np.arange(steps + 1)
+    i, j = np.meshgrid(k, k, indexing='ij')
+    ij = np.stack([i.ravel(), j.ravel()], axis=1)
+    ij = ij[ij.sum(axis=1) <= steps]
+    counts = steps - ij.sum(axis=1) + 1
+    first = np.repeat(ij, counts, axis=0)
+    last = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+    k = np.column_stack([first, last])
+    X = k / steps
+    # k_i / steps can put a face point at sum 1 + 1 ulp (scored insoluble): close
+    # the face with x_3 = 1 - (x_1 + x_2) instead, whose float sum is exactly 1
+    face = k.sum(axis=1) == steps
+    X[face, 2] = 1.0 - (X[face, 0] + X[face, 1])
+    return X
+
+def project_to_simplex(X):
+    """
+    Clips rows of X to x >= 0 and rescales any row with sum(x) > 1 onto the
+    face sum(x) = 1, guaranteeing sum(x) <= 1 in floating point as well.
+    """
+    X = np.clip(X, 0.0, None)
+    X = X / np.maximum(X.sum(axis=1, keepdims=True), 1.0)
+    # Rounding can leave a rescaled row at 1 + 1 ulp, which the solubility check
+    # (sum > 1) scores as insoluble: shrink those rows by one relative ulp until they fit
+    over = X.sum(axis=1) > 1.0
+    while np.any(over):
+        X[over] *= 1.0 - np.finfo(np.float64).eps
+        over = X.sum(axis=1) > 1.0
+    return X
+
+def check_batch(q=8, n_observed=10, refine_starts=5, seed=0):
+    """
+    Self-check for propose_batch: fits the surrogate on n_observed noisy
+    experiments and verifies that each strategy proposes q distinct
+    compositions (no two within 1e-3 mole fraction). Returns True when both pass.
+    """
+    warnings.filterwarnings("ignore") # GP convergence chatter
+    np.random.seed(seed)
+    optimizer = RealPhysicsOptimizer()
+    X = sample_simplex(n_observed, seed=seed) * 0.6
+    Y = optimizer.run_experiments(X)
+    gp = IncrementalGP(random_state=42)
+    gp.fit(X, Y)
+    candidates = sample_simplex(1024, seed=seed + 1)
+    incumbents = X[np.argsort(Y)[-3:]] if refine_starts else None
+
+    ok = True
+    for strategy in ("believer", "liar"):
+        batch = optimizer.propose_batch(candidates, gp, Y, q, strategy, refine_starts, incumbents)
+        gaps = np.linalg.norm(batch[:, None, :] - batch[None, :, :], axis=2)[np.triu_indices(q, 1)]
+        passed = gaps.min() > 1e-3
+        ok &= passed
+        print(f">> {strategy:<8} batch of {q}: closest pair {gaps.min():.2e} apart -> " + ("PASS" if passed else "FAIL (repeated proposals)"))
+    return ok
+
+def _seeded_experiment(optimizer, composition, seed):
+    """Process-pool task: one experiment with its own noise seed."""
+    np.random.seed(seed)
+    return optimizer.run_experiment(composition)
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Bayesian optimization of halide doping in beta-Li3PS4")
+    parser.add_argument("--iterations", type=int, default=100)
+    parser.add_argument("--refit-every", type=int, default=10, help="Experiments between GP hyperparameter refits")
+    parser.add_argument("--drift-tol", type=float, default=0.5,
+                        help="Refit early when the log marginal likelihood per point moves this much (nats)")
+    parser.add_argument("--restarts", type=int, default=10, help="Optimizer restarts per hyperparameter refit")
+    parser.add_argument("--batch-size", type=int, default=1, help="Compositions proposed (and run in parallel) per round")
+    parser.add_argument("--strategy", choices=["believer", "liar"], default="believer",
+                        help="Batch proposals: Kriging believer or constant liar")
+    parser.add_argument("--workers", type=int, default=None, help="Experiment processes (default: batch size)")
+    parser.add_argument("--candidates", choices=["simplex", "box"], default="simplex",
+                        help="Fresh Sobol points on the feasible simplex each round, or the original fixed box pool")
+    parser.add_argument("--refine-starts", type=int, default=5, help="Gradient-based EI refinement starts (0 = off)")
+    parser.add_argument("--ground-truth", type=int, default=0, metavar="STEPS",
+                        help="Also map the noise-free landscape on a simplex grid with this many steps "
+                             "per axis (180 ~ 1e6 points) and report the gap to its optimum")
+    parser.add_argument("--check-batch", action="store_true",
+                        help="Verify that both batch strategies propose distinct compositions, then exit")
+    args = parser.parse_args()
+
+    if args.check_batch:
+        sys.exit(0 if check_batch(q=max(args.batch_size, 8), refine_starts=args.refine_starts) else 1)
+
+    # Run Real Physics
+    optimizer = RealPhysicsOptimizer()
+    best_x = optimizer.optimize(iterations=args.iterations, refit_every=args.refit_every,
+                       drift_tol=args.drift_tol, n_restarts=args.restarts,
+                       batch_size=args.batch_size, strategy=args.strategy, workers=args.workers,
+                       candidates=args.candidates, refine_starts=args.refine_starts)
+
+    if args.ground_truth:
+        t0 = time.time()
+        grid = simplex_grid(args.ground_truth)
+        landscape = optimizer.run_experiments(grid, noise=0)
+        top = np.argmax(landscape)
+        found = optimizer.run_experiments(best_x, noise=0)[0]
+        print(f"\nGROUND TRUTH ({len(grid):,} compositions in {time.time() - t0:.2f}s):")
+        print(f"Cl: {grid[top][0]:.3f} | Br: {grid[top][1]:.3f} | I: {grid[top][2]:.3f} -> {landscape[top]:.4f} V")
+        print(f"BO composition (noise-free): {found:.4f} V | gap {landscape[top] - found:.4f} V | "
+              f"beaten by {np.mean(landscape > found)*100:.3f}% of the grid")
@@ -0,0 +1,102 @@
+import copy
+import numpy as np # type: ignore
+
+class IncrementalGP:
+    """
+    GP surrogate for one-point-at-a-time Bayesian optimization.
+    Hyperparameters are fitted by sklearn's GaussianProcessRegressor (with
+    n_restarts optimizer restarts, warm-started from the last fit), but only
+    every `refit_every` added points or when the log marginal likelihood per
+    point drifts by more than `drift_tol` nats from its value at the last fit.
+    In between, add() appends one row to the Cholesky factor of K + alpha*I,
+    which is O(n^2) instead of an O(n^3) factorization plus restarts.
+    predict() matches sklearn's predict for the same kernel and data.
+    """
+    def __init__(self, kernel=None, alpha=1e-10, refit_every=10, drift_tol=0.5, n_restarts=10, random_state=42):
+        from sklearn.gaussian_process.kernels import Matern # type: ignore
+
+        self.kernel_ = kernel if kernel is not None else Matern(length_scale=1.0, nu=2.5)
+        self.alpha = alpha
+        self.refit_every = refit_every
+        self.drift_tol = drift_tol
+        self.n_restarts = n_restarts
+        self.random_state = random_state
+        self.n_refits = 0
+
+    def fit(self, X, y):
+        """Full fit: optimizes the kernel hyperparameters, then factorizes."""
+        from sklearn.gaussian_process import GaussianProcessRegressor # type: ignore
+
+        gp = GaussianProcessRegressor(kernel=self.kernel_, alpha=self.alpha,
+                                      n_restarts_optimizer=self.n_restarts, random_state=self.random_state)
+        gp.fit(X, y)
+        self.kernel_ = gp.kernel_
+        self.X_train_ = np.array(X, dtype=np.float64)
+        self.y_train_ = np.array(y, dtype=np.float64)
+        self.L_ = gp.L_
+        self.alpha_ = gp.alpha_
+        self.n_refits += 1
+        self._since_refit = 0
+        self._lml_ref = self.log_marginal_likelihood() / len(self.y_train_)
+        return self
+
+    def _append(self, x, y):
+        """Adds one observation and one row to L_; False if K + alpha*I went singular (L_ left stale)."""
+        from scipy.linalg import cho_solve, solve_triangular # type: ignore
+
+        x = np.asarray(x, dtype=np.float64).reshape(1, -1)
+        k = self.kernel_(self.X_train_, x)[:, 0]
+        l = solve_triangular(self.L_, k, lower=True)
+        d2 = self.kernel_.diag(x)[0] + self.alpha - l @ l
+
+        self.X_train_ = np.vstack([self.X_train_, x])
+        self.y_train_ = np.append(self.y_train_, y)
+        if d2 <= 0:
+            return False
+
+        n = len(l)
+        L = np.zeros((n + 1, n + 1))
+        L[:n, :n] = self.L_
+        L[n, :n] = l
+        L[n, n] = np.sqrt(d2)
+        self.L_ = L
+        self.alpha_ = cho_solve((self.L_, True), self.y_train_, check_finite=False)
+        return True
+
+    def add(self, x, y):
+        """Appends one observation; refits hyperparameters only when due."""
+        self._since_refit += 1
+        if not self._append(x, y) or self._since_refit >= self.refit_every:
+            # Numerically singular append, or a scheduled refit
+            return self.fit(self.X_train_, self.y_train_)
+
+        drift = abs(self.log_marginal_likelihood() / len(self.y_train_) - self._lml_ref)
+        if drift > self.drift_tol:
+            return self.fit(self.X_train_, self.y_train_)
+        return self
+
+    def fantasize(self, x, y):
+        """
+        Copy conditioned on one extra (pretend) observation with the same
+        hyperparameters, for batch proposals; self is left untouched.
+        A point that would make K singular is already pinned down, so it is skipped.
+        """
+        model = copy.copy(self)
+        return model if model._append(x, y) else self
+
+    def log_marginal_likelihood(self):
+        """log p(y | X, current hyperparameters), from the cached factorization (O(n))."""
+        n = len(self.y_train_)
+        return (-0.5 * self.y_train_ @ self.alpha_ - np.log(np.diag(self.L_)).sum()
+                - 0.5 * n * np.log(2 * np.pi))
+
+    def predict(self, X, return_std=False):
+        from scipy.linalg import solve_triangular # type: ignore
+
+        K_trans = self.kernel_(X, self.X_train_)
+        mean = K_trans @ self.alpha_
+        if not return_std:
+            return mean
+        V = solve_triangular(self.L_, K_trans.T, lower=True, check_finite=False)
+        var = self.kernel_.diag(X) - np.einsum("ij,ij->j", V, V)
+        return mean, np.sqrt(np.maximum(var, 0.0))
@@ -1,8 +1,14 @@
+import os
+import sys
 import gymnasium as gym # type: ignore
 from gymnasium import spaces # type: ignore
 import numpy as np # type: ignore
 
-class AlloyFurnaceEnv(gym.Env):
+# Repo root holds the shared A->B->C kinetics
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from kinetics import INTEGRATORS, ArrheniusRateTable, exact_chain # type: ignore
+
+class AlloyFurnaceEnv(ArrheniusRateTable, gym.Env):
     """
     Virtual Furnace v11.0 (Beta-Phase Specialist)
     Target: Metastable Beta-Li3PS4
@@ -11,9 +17,17 @@ class AlloyFurnaceEnv(gym.Env):
     - Formation Window: 140°C - 200°C (413K - 473K).
     - Danger Zone: > 250°C (523K) triggers rapid Gamma decay.
     - Strategy: "Pulse & Quench" (Heat precisely, then cool fast).
+
+    integrator="exact" replaces the explicit Euler update with the analytic
+    A->B->C solution; control_interval sets the minutes per action (the
+    episode stays 5 hours) and scales the +/-5 K step to keep the ramp rate.
     """
-    def __init__(self):
+    RATE_CONSTANTS = (('A_form', 'Ea_form_R'), ('A_trans', 'Ea_trans_R')) # Order returned by _rates(T)
+
+    def __init__(self, integrator="euler", control_interval=1):
         super(AlloyFurnaceEnv, self).__init__()
+        if integrator not in INTEGRATORS:
+            raise ValueError(f"integrator must be one of {INTEGRATORS}, got {integrator!r}")
         
         # ACTIONS: 0=Cool (-5K), 1=Hold, 2=Heat (+5K)
         # We use smaller temp steps (5K) because solvents are sensitive.
@@ -40,15 +54,19 @@ class AlloyFurnaceEnv(gym.Env):
         self.Ea_trans_R = 9000.0
         self.A_trans = 5.0e5        
         
-        self.dt = 1.0  
-        self.max_time = 300 # 5 Hours total budget
+        self.integrator = integrator
+        self.dt = float(control_interval)
+        self.max_time = int(round(300 / self.dt)) # 5 Hours total budget, in decisions
+        self.temp_step = 5.0 * self.dt
+        self.temp_min, self.temp_max = 300.0, 600.0
+        self.build_rate_table()
 
     def reset(self, seed=None, options=None):
         super().reset(seed=seed)
         
         # Start Cold (Room Temp 300K)
         # We allow a slight random variance to robustify the agent.
-        self.temp = float(np.random.uniform(295, 305))
+        self.temp = float(self.np_random.uniform(295, 305))
         
         if options and 'temp' in options:
             self.temp = float(options['temp'])
@@ -56,34 +74,38 @@ class AlloyFurnaceEnv(gym.Env):
         # State: [Precursor, Beta(Target), Gamma(Waste)]
         self.state = np.array([1.0, 0.0, 0.0]) 
         self.time_step = 0
+        self._reset_rates()
         return self._get_obs(), {}
 
     def step(self, action):
         # 1. Control System
-        if action == 0: self.temp -= 5 
-        elif action == 2: self.temp += 5 
+        if action == 0: self.temp -= self.temp_step
+        elif action == 2: self.temp += self.temp_step
         
         # Safety Limits: 300K to 600K (27°C to 327°C)
-        self.temp = np.clip(self.temp, 300, 600)
+        self.temp = np.clip(self.temp, self.temp_min, self.temp_max)
         
-        # 2. Arrhenius Kinetics
+        # 2. Arrhenius Kinetics (rate table, direct evaluation off the grid)
         T = self.temp
-        k_form = self.A_form * np.exp(-self.Ea_form_R / T)
-        k_trans = self.A_trans * np.exp(-self.Ea_trans_R / T)
-        
-        prec, beta, gamma = self.state
-        
-        # Calculate Flows
-        moles_forming = k_form * prec * self.dt       # Precursor -> Beta
-        moles_decaying = k_trans * beta * self.dt     # Beta -> Gamma (Overcooking)
+        k_form, k_trans = self._rates(T)
         
-        # Update Mass Balance
-        self.state[0] -= moles_forming
-        self.state[1] += (moles_forming - moles_decaying)
-        self.state[2] += moles_decaying
-        
-        # Physics Check (Mass conservation)
-        self.state = np.clip(self.state, 0, 1)
+        if self.integrator == "exact":
+            # Closed-form flows; mass is conserved without clipping
+            self.state, moles_forming, moles_decaying = exact_chain(self.state, k_form, k_trans, self.dt)
+        else:
+            prec, beta, gamma = self.state
+            
+            # Calculate Flows
+            moles_forming = k_form * prec * self.dt       # Precursor -> Beta
+            moles_decaying = k_trans * beta * self.dt     # Beta -> Gamma (Overcooking)
+            
+            # Update Mass Balance
+            self.state[0] -= moles_forming
+            self.state[1] += (moles_forming - moles_decaying)
+            self.state[2] += moles_decaying
+            
+            # Physics Check (Mass conservation)
+            self.state = np.clip(self.state, 0, 1)
         
         self.time_step += 1
         done = self.time_step >= self.max_time
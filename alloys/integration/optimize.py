@@ -2,20 +2,32 @@ import sys
 import os
 # Add the integration directory to path so imports work from anywhere
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+# Repo root holds the shared multi-core PPO trainer
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
 
+import argparse
 from battery import BatteryInterfaceEnv
-from stable_baselines3 import PPO # type: ignore
+from trainer import add_training_args, train_ppo, load_policy, trained_env_kwargs # Shared SubprocVecEnv/DummyVecEnv PPO setup
 import matplotlib.pyplot as plt # type: ignore
-import numpy as np # type: ignore
+
+parser = argparse.ArgumentParser(description="PPO formation-protocol optimizer")
+add_training_args(parser, timesteps=50000)
+args = parser.parse_args()
 
 # 1. Init Environment
-env = BatteryInterfaceEnv()
+# (--eval-only tests on the env the saved policy was trained on)
+run_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), "checkpoints")
+env = BatteryInterfaceEnv(**(trained_env_kwargs("battery", run_dir) if args.eval_only else {}))
 
 # 2. Train Agent
 # NOTE: Observation space is 3D [SEI, Resistance, Charge]
 print("🔋 Starting Interface Stabilization Training...")
-model = PPO("MlpPolicy", env, verbose=1)
-model.learn(total_timesteps=50000)
+if args.eval_only:
+    model = load_policy("battery", run_dir) # Saved final model, no retraining
+else:
+    model = train_ppo("battery", n_envs=args.n_envs, vec=args.vec, total_timesteps=args.timesteps,
+                      run_dir=run_dir, checkpoint_every=args.checkpoint_every,
+                      resume=args.resume, normalize=args.normalize)
 print("✅ Training Complete.")
 
 # 3. Test the "Formation Protocol"
@@ -0,0 +1,119 @@
+import os
+import sys
+import numpy as np # type: ignore
+# Repo root holds the shared batched-VecEnv plumbing
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+from vec_base import BatchedVecEnv # type: ignore
+from battery import BatteryInterfaceEnv # Scalar reference physics
+
+class BatteryInterfaceVecEnv(BatchedVecEnv):
+    """
+    N independent cells stepped together, each with its own current.
+    State lives in (N,) arrays and every step is one NumPy pass with the
+    float64 operations of BatteryInterfaceEnv.step (SEI growth, passivation
+    damping, Joule heating, the thin-SEI speeding penalty and the failure /
+    end-of-cycle rules), so lane i is bit-for-bit identical to a scalar env.
+    Drop-in SB3 VecEnv (see vec_base.BatchedVecEnv).
+    """
+    def __init__(self, num_envs):
+        ref = BatteryInterfaceEnv()
+
+        # --- PHYSICS (copied from the scalar env, single source of truth) ---
+        self.base_sei_growth_rate = ref.base_sei_growth_rate
+        self.resistance_per_nm = ref.resistance_per_nm
+        self.max_steps = ref.max_steps
+
+        self.sei_thickness = np.zeros(num_envs)
+        self.charge_stored = np.zeros(num_envs)
+        self.time_step = np.zeros(num_envs, dtype=np.int64)
+        self.actions = None
+        super().__init__(num_envs, ref.observation_space, ref.action_space)
+
+    def _reset_lanes(self, lanes):
+        self.sei_thickness[lanes] = 2.0
+        self.charge_stored[lanes] = 0.0
+        self.time_step[lanes] = 0
+
+    def _step_lanes(self, actions):
+        # 1. INPUT
+        J = np.clip(actions.reshape(self.num_envs, -1)[:, 0], 0.0, 1.0).astype(np.float64)
+        return self._advance(J)
+
+    def _advance(self, J):
+        """Physics + reward for one minute at current densities J (N,)."""
+        # 2. PHYSICS
+        growth_factor = 1.0 + (J * 20.0)
+        passivation_damping = np.exp(-self.sei_thickness / 5.0)
+        growth = self.base_sei_growth_rate * growth_factor * passivation_damping
+        self.sei_thickness = self.sei_thickness + growth
+        resistance = self.sei_thickness * self.resistance_per_nm
+
+        # 3. REWARD
+        reward = J * 50.0
+
+        # 4. COSTS (Joule heating, then the gentle wall while the SEI is thin)
+        joule_heating = (J ** 2) * resistance
+        reward = reward - (joule_heating * 1.0)
+        speeding = (self.sei_thickness < 8.0) & (J > 0.3)
+        reward = np.where(speeding, reward - ((J - 0.3) ** 2) * 50.0, reward)
+
+        # 5. SAFETY LIMITS
+        failed = self.sei_thickness > 50.0
+        timeout = ~failed & (self.time_step >= self.max_steps)
+        reward = np.where(failed, reward - 100.0, reward)
+        reward = np.where(timeout & (J > 0.2), reward - 200.0, reward)
+        dones = failed | timeout
+
+        self.charge_stored = self.charge_stored + J * 1.0
+        self.time_step += 1
+        return reward, dones
+
+    def run_protocols(self, currents):
+        """
+        Open-loop evaluation from the lanes' current (freshly reset) state.
+        `currents` is (num_envs, horizon) current densities, clipped to [0, 1].
+        A cell that fails (SEI > 50 nm) or reaches the end of the cycle stops
+        there; later entries of its protocol are ignored.
+        Returns final SEI, stored charge, summed reward, steps run and a failed flag.
+        """
+        currents = np.clip(np.asarray(currents, dtype=np.float64), 0.0, 1.0)
+        if currents.shape[0] != self.num_envs:
+            raise ValueError(f"currents must have {self.num_envs} rows, got {currents.shape}")
+        total = np.zeros(self.num_envs)
+        steps = np.zeros(self.num_envs, dtype=np.int64)
+        running = np.ones(self.num_envs, dtype=bool)
+        failed = np.zeros(self.num_envs, dtype=bool)
+        for J in currents.T:
+            if not running.any():
+                break
+            sei, charge, time_step = self.sei_thickness, self.charge_stored, self.time_step.copy()
+            reward, dones = self._advance(J)
+            # Finished cells keep their final state
+            self.sei_thickness = np.where(running, self.sei_thickness, sei)
+            self.charge_stored = np.where(running, self.charge_stored, charge)
+            self.time_step = np.where(running, self.time_step, time_step)
+            total += np.where(running, reward, 0.0)
+            steps += running
+            failed |= running & (self.sei_thickness > 50.0)
+            running &= ~dones
+        return {'sei': self.sei_thickness.copy(), 'charge': self.charge_stored.copy(),
+                'reward': total, 'steps': steps, 'failed': failed}
+
+    def _get_obs(self):
+        return np.stack([
+            self.sei_thickness,
+            self.sei_thickness * self.resistance_per_nm,
+            self.charge_stored
+        ], axis=1).astype(np.float32)
+
+def score_protocols(currents):
+    """
+    Scores N formation protocols at once with BatteryInterfaceEnv physics.
+    `currents`: (num_protocols, horizon) current densities in [0, 1]; one cycle
+    is max_steps + 1 = 201 minutes, so horizon > 201 is never reached.
+    Returns {'sei', 'charge', 'reward', 'steps', 'failed'} arrays of shape (num_protocols,).
+    """
+    currents = np.atleast_2d(currents)
+    env = BatteryInterfaceVecEnv(len(currents))
+    env.reset()
+    return env.run_protocols(currents)
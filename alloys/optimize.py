@@ -2,30 +2,58 @@ import sys
 import os
 # Add the synthesis directory to path so imports work from anywhere
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+# Repo root holds the shared multi-core PPO trainer
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
+import argparse
 import numpy as np # type: ignore
 import matplotlib.pyplot as plt # type: ignore
-from stable_baselines3 import PPO # type: ignore
 from furnace import AlloyFurnaceEnv # Imports your physics simulator
+from vec_furnace import kinetics_sampler # Per-lane kinetics for the batched furnaces
+from trainer import add_training_args, train_ppo, load_policy, trained_env_kwargs # Shared SubprocVecEnv/DummyVecEnv PPO setup
+
+parser = argparse.ArgumentParser(description="PPO synthesis optimizer for Beta-Li3PS4")
+# Batched furnaces by default: they are the only backend with per-lane kinetics
+add_training_args(parser, timesteps=150000, vec="batched")
+parser.add_argument("--kinetics-spread", type=float, default=0.0,
+                    help="Randomize each furnace's kinetics by +/- this fraction (robust policy, --vec batched)")
+parser.add_argument("--integrator", choices=["euler", "exact"], default="euler", help="Kinetics update per step")
+parser.add_argument("--control-interval", type=int, default=1, help="Minutes per action (use with --integrator exact)")
+args = parser.parse_args()
+env_kwargs = {'integrator': args.integrator, 'control_interval': args.control_interval}
+run_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), "checkpoints")
+if args.eval_only:
+    # The exam runs on the furnace the saved policy was trained on, not this run's flags
+    env_kwargs = trained_env_kwargs("alloy", run_dir)
 
 # 1. SETUP THE LAB
 # We initialize the environment with the scientific values you added
-env = AlloyFurnaceEnv()
+env = AlloyFurnaceEnv(**env_kwargs)
+# Each training lane can carry its own precursor chemistry (recorded with the run as a setting)
+vec_kwargs, settings = {}, {}
+if args.kinetics_spread > 0:
+    vec_kwargs = {'param_sampler': kinetics_sampler(args.kinetics_spread)}
+    settings = {'kinetics_spread': args.kinetics_spread}
 
 # 2. HIRE THE OPERATOR (The Agent)
 # We use PPO (Proximal Policy Optimization), a standard robust RL algorithm.
-model = PPO("MlpPolicy", env, verbose=1)
-
+# Training runs on --n-envs furnaces (rollout sizes are tuned to that count).
 print("👨‍🔬 TRAINING STARTED: The agent is learning thermal kinetics...")
 print("    (This will take about 30 seconds on a laptop)")
 
 # 3. TRAINING LOOP
 # The agent tries 150,000 minutes of experiment time to find the pattern.
-model.learn(total_timesteps=150000)
+if args.eval_only:
+    model = load_policy("alloy", run_dir) # Saved final model, no retraining
+else:
+    model = train_ppo("alloy", n_envs=args.n_envs, vec=args.vec, total_timesteps=args.timesteps,
+                      run_dir=run_dir, checkpoint_every=args.checkpoint_every,
+                      resume=args.resume, normalize=args.normalize, env_kwargs=env_kwargs, settings=settings,
+                      **vec_kwargs)
 print("✅ TRAINING COMPLETE.")
 
 # 4. THE FINAL EXAM
-# We reset the furnace and let the trained agent run one perfect cycle.
+# We reset the (nominal) furnace and let the trained agent run one perfect cycle.
 obs, _ = env.reset()
 done = False
 path_temp = []
@@ -47,6 +75,8 @@ while not done:
     path_impurity.append(obs[2])
 
 # 5. VISUALIZATION
+# One point per action, env.dt minutes apart
+minutes = np.arange(len(path_temp)) * env.dt
 # Plotting the "Master Recipe"
 fig, ax1 = plt.subplots(figsize=(10, 6))
 
@@ -54,7 +84,7 @@ fig, ax1 = plt.subplots(figsize=(10, 6))
 color = 'tab:red'
 ax1.set_xlabel('Time (minutes)')
 ax1.set_ylabel('Furnace Temp (K)', color=color)
-ax1.plot(path_temp, color=color, linewidth=2, label="Temperature Profile")
+ax1.plot(minutes, path_temp, color=color, linewidth=2, label="Temperature Profile")
 ax1.tick_params(axis='y', labelcolor=color)
 ax1.set_ylim(0, 750)
 ax1.grid(True, alpha=0.3)
@@ -63,8 +93,8 @@ ax1.grid(True, alpha=0.3)
 ax2 = ax1.twinx() 
 color = 'tab:blue'
 ax2.set_ylabel('Phase Fraction', color=color)
-ax2.plot(path_yield, color=color, linewidth=2, label="Lithium Thiophosphate Yield")
-ax2.plot(path_impurity, color='black', linewidth=1, linestyle="--", label="Impurity (Degradation)")
+ax2.plot(minutes, path_yield, color=color, linewidth=2, label="Lithium Thiophosphate Yield")
+ax2.plot(minutes, path_impurity, color='black', linewidth=1, linestyle="--", label="Impurity (Degradation)")
 ax2.tick_params(axis='y', labelcolor=color)
 ax2.set_ylim(0, 1.1)
 
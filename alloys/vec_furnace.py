@@ -0,0 +1,94 @@
+import os
+import sys
+import numpy as np # type: ignore
+# Repo root holds the shared batched-VecEnv plumbing
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from vec_base import BatchedFurnaceVecEnv # type: ignore
+from kinetics import exact_chain # type: ignore
+from furnace import AlloyFurnaceEnv # Scalar reference physics
+
+KINETIC_PARAMS = ('Ea_form_R', 'A_form', 'Ea_trans_R', 'A_trans')
+
+def kinetics_sampler(spread=0.1, nominal=None):
+    """
+    Domain randomization over precursor chemistries.
+    Activation energies vary uniformly by +/- spread, pre-exponential factors
+    log-uniformly by a factor of (1 + spread) either way, around the nominal
+    AlloyFurnaceEnv values.
+    """
+    if nominal is None:
+        ref = AlloyFurnaceEnv()
+        nominal = {name: getattr(ref, name) for name in KINETIC_PARAMS}
+
+    def sample(rng):
+        return {
+            'Ea_form_R': nominal['Ea_form_R'] * rng.uniform(1 - spread, 1 + spread),
+            'A_form': nominal['A_form'] * np.exp(rng.uniform(-1, 1) * np.log1p(spread)),
+            'Ea_trans_R': nominal['Ea_trans_R'] * rng.uniform(1 - spread, 1 + spread),
+            'A_trans': nominal['A_trans'] * np.exp(rng.uniform(-1, 1) * np.log1p(spread)),
+        }
+    return sample
+
+class AlloyFurnaceVecEnv(BatchedFurnaceVecEnv):
+    """
+    N independent Beta-Li3PS4 furnaces stepped together.
+    Every lane carries its own kinetics (Ea_form_R, A_form, Ea_trans_R, A_trans):
+    pass scalars or (N,) arrays, and/or a `param_sampler(rng) -> dict` that
+    redraws a lane's kinetics at each of its resets (see kinetics_sampler).
+    With nominal kinetics and no sampler, lane i is bit-for-bit identical to
+    AlloyFurnaceEnv reset with seed + i.
+    Drop-in SB3 VecEnv (see vec_base.BatchedVecEnv).
+    `integrator` / `control_interval` as in AlloyFurnaceEnv.
+    """
+    def __init__(self, num_envs, param_sampler=None, integrator="euler", control_interval=1, **kinetics):
+        ref = AlloyFurnaceEnv(integrator=integrator, control_interval=control_interval)
+
+        # --- PHYSICS (per lane, defaulting to the scalar env's calibration) ---
+        unknown = set(kinetics) - set(KINETIC_PARAMS)
+        if unknown:
+            raise ValueError(f"Unknown kinetic parameters: {sorted(unknown)}")
+        for name in KINETIC_PARAMS:
+            value = kinetics.get(name, getattr(ref, name))
+            setattr(self, name, np.broadcast_to(np.asarray(value, dtype=np.float64), (num_envs,)).copy())
+        self.param_sampler = param_sampler
+        super().__init__(num_envs, ref)
+
+    def _reset_lanes(self, lanes):
+        for i in lanes:
+            rng = self._lane_rng(i)
+            self.temp[i] = self._start_temp(i, float(rng.uniform(295, 305)))
+            if self.param_sampler is not None:
+                for name, value in self.param_sampler(rng).items():
+                    getattr(self, name)[i] = value
+        self.state[lanes] = [1.0, 0.0, 0.0]
+        self.time_step[lanes] = 0
+
+    def _advance(self):
+        """Kinetics + reward for one control interval at the current temperatures."""
+        # 2. Arrhenius Kinetics (per-lane parameters)
+        T = self.temp
+        k_form = self.A_form * np.exp(-self.Ea_form_R / T)
+        k_trans = self.A_trans * np.exp(-self.Ea_trans_R / T)
+
+        if self.integrator == "exact":
+            self.state, moles_forming, moles_decaying = exact_chain(self.state, k_form, k_trans, self.dt)
+        else:
+            prec, beta = self.state[:, 0].copy(), self.state[:, 1].copy()
+            moles_forming = k_form * prec * self.dt
+            moles_decaying = k_trans * beta * self.dt
+
+            self.state[:, 0] -= moles_forming
+            self.state[:, 1] += (moles_forming - moles_decaying)
+            self.state[:, 2] += moles_decaying
+            self.state = np.clip(self.state, 0, 1)
+
+        self.time_step += 1
+        dones = self.time_step >= self.max_time
+
+        # --- 3. THE "DELTA JUDGE" REWARD SYSTEM (same rules as the scalar env) ---
+        reward = (moles_forming - moles_decaying) * 2000.0
+        reward = np.where(moles_decaying > 0, reward - moles_decaying * 5000.0, reward)
+        reward = np.where(dones, reward + self.state[:, 1] * 50.0, reward)
+        return reward, dones
+
+evaluate_recipes = AlloyFurnaceVecEnv.evaluate_recipes
@@ -0,0 +1,158 @@
+import os
+import time
+import argparse
+import numpy as np # type: ignore
+
+# Get repo root for relative paths
+repo_root = os.path.dirname(os.path.abspath(__file__))
+
+# Cells per observation axis (temp, yield, impurity, time); temp=None follows the env's temperature grid
+DEFAULT_BINS = (None, 21, 11, 31)
+
+class TableController:
+    """
+    Distilled furnace controller: the policy's action probabilities on a
+    uniform (temp, yield, impurity, time) observation grid.
+    predict() snaps observations to the nearest cell, then samples an action
+    from that cell (or takes its argmax with deterministic=True), so a recipe
+    runs with NumPy only (no torch / stable-baselines3 import).
+    Same call shape as model.predict(): (action, None) for one obs or a batch.
+    """
+    def __init__(self, probs, lows, highs, seed=None):
+        self.probs = np.asarray(probs, dtype=np.float16)
+        self.lows = np.asarray(lows, dtype=np.float64)
+        self.highs = np.asarray(highs, dtype=np.float64)
+        self.shape = np.array(self.probs.shape[:-1])
+
+        flat = self.probs.reshape(-1, self.probs.shape[-1]).astype(np.float32)
+        self.greedy = flat.argmax(axis=1).astype(np.uint8)
+        self.cdf = np.cumsum(flat / flat.sum(axis=1, keepdims=True), axis=1)
+        self.rng = np.random.default_rng(seed)
+
+    @classmethod
+    def load(cls, path, seed=None):
+        data = np.load(path)
+        return cls(data['probs'], data['lows'], data['highs'], seed=seed)
+
+    def save(self, path):
+        np.savez(path, probs=self.probs, lows=self.lows, highs=self.highs)
+        return path
+
+    def seed(self, seed=None):
+        self.rng = np.random.default_rng(seed)
+
+    def cells(self, obs):
+        """Nearest grid cell (flat index) for each observation row."""
+        scaled = (np.atleast_2d(obs) - self.lows) / (self.highs - self.lows) * (self.shape - 1)
+        idx = np.clip(np.rint(scaled), 0, self.shape - 1).astype(np.int64)
+        return np.ravel_multi_index(idx.T, tuple(self.shape))
+
+    def predict(self, obs, deterministic=False):
+        cells = self.cells(obs)
+        if deterministic:
+            actions = self.greedy[cells]
+        else:
+            u = self.rng.random(len(cells))[:, None]
+            actions = (self.cdf[cells, :-1] < u).sum(axis=1)
+        return (actions if np.ndim(obs) > 1 else actions[0]), None
+
+def grid_axes(env, bins=DEFAULT_BINS):
+    """Cell centres per axis, in observation units (temp is obs[0] = T / temp_max)."""
+    n_temp, n_yield, n_impurity, n_time = bins
+    if n_temp is None:
+        n_temp = int(round((env.temp_max - env.temp_min) / env.temp_step)) + 1
+    return [
+        np.linspace(env.temp_min / env.temp_max, 1.0, n_temp),
+        np.linspace(0.0, 1.0, n_yield),
+        np.linspace(0.0, 1.0, n_impurity),
+        np.linspace(0.0, 1.0, n_time),
+    ]
+
+def distill(policy, env, bins=DEFAULT_BINS, batch_size=65536):
+    """
+    Queries the policy's action distribution at every cell centre.
+    `policy` needs action_probs(obs) -> (N, n_actions), e.g. trainer.TrainedPolicy.
+    """
+    axes = grid_axes(env, bins)
+    shape = tuple(len(a) for a in axes)
+    n_cells = int(np.prod(shape))
+    probs = np.zeros((n_cells, env.action_space.n), dtype=np.float16)
+    for start in range(0, n_cells, batch_size):
+        flat = np.arange(start, min(start + batch_size, n_cells))
+        idx = np.unravel_index(flat, shape)
+        obs = np.stack([axis[i] for axis, i in zip(axes, idx)], axis=1).astype(np.float32)
+        probs[flat] = policy.action_probs(obs)
+    lows = [a[0] for a in axes]
+    highs = [a[-1] for a in axes]
+    return TableController(probs.reshape(shape + (-1,)), lows, highs)
+
+def rollout(controller, env, seed=None, options=None, deterministic=False):
+    """Runs one episode; returns (final_yield, final_impurity, total_reward, observations)."""
+    obs, _ = env.reset(seed=seed, options=options)
+    done, total, visited = False, 0.0, []
+    while not done:
+        visited.append(obs)
+        action, _ = controller.predict(obs, deterministic=deterministic)
+        obs, reward, terminated, truncated, _ = env.step(int(action))
+        total += reward
+        done = terminated or truncated
+    return float(env.state[1]), float(env.state[2]), total, np.array(visited)
+
+def validate(controller, policy, env, seeds=range(20), deterministic=False):
+    """
+    Runs the table and the neural policy from the same starts (reset seeds)
+    and compares final yield / impurity / reward. `tv_distance` is the mean
+    total-variation distance between the two action distributions on the
+    states the neural policy visited (0 = identical policy there).
+    Returns a per-start report as a dict of arrays.
+    """
+    rows = []
+    for seed in seeds:
+        y_nn, i_nn, r_nn, visited = rollout(policy, env, seed=seed, deterministic=deterministic)
+        y_tab, i_tab, r_tab, _ = rollout(controller, env, seed=seed, deterministic=deterministic)
+        table_probs = np.diff(controller.cdf[controller.cells(visited)], axis=1, prepend=0.0)
+        tv = 0.5 * np.abs(policy.action_probs(visited) - table_probs).sum(axis=1).mean()
+        rows.append((seed, y_nn, y_tab, i_nn, i_tab, r_nn, r_tab, tv))
+    cols = ['seed', 'yield_nn', 'yield_table', 'impurity_nn', 'impurity_table', 'reward_nn', 'reward_table', 'tv_distance']
+    return {name: np.array(col) for name, col in zip(cols, zip(*rows))}
+
+if __name__ == '__main__':
+    import torch # type: ignore
+    import trainer # SB3 + torch are only needed to export, not to run the table
+
+    parser = argparse.ArgumentParser(description="Distill a trained furnace PPO policy into a NumPy lookup table")
+    parser.add_argument("--env", choices=["perovskite", "alloy"], required=True)
+    parser.add_argument("--run-dir", required=True, help="Checkpoint directory holding ppo_<env>_final.zip")
+    parser.add_argument("--bins", type=int, nargs=3, default=DEFAULT_BINS[1:], metavar=("YIELD", "IMPURITY", "TIME"),
+                        help="Cells on the yield, impurity and time axes (temp follows the env grid)")
+    parser.add_argument("--episodes", type=int, default=100, help="Validation starts (sampled policies are noisy)")
+    parser.add_argument("--deterministic", action="store_true", help="Validate argmax actions instead of sampling")
+    args = parser.parse_args()
+
+    policy = trainer.load_policy(args.env, args.run_dir)
+    # Distill and validate on the furnace the policy was trained on (integrator, control interval)
+    env_kwargs = trainer.trained_env_kwargs(args.env, args.run_dir)
+    env = trainer.load_class(args.env)(**env_kwargs)
+
+    t0 = time.time()
+    controller = distill(policy, env, bins=(None, *args.bins))
+    out = controller.save(os.path.join(args.run_dir, f"controller_{args.env}.npz"))
+    print(f"🗜️  Distilled {int(np.prod(controller.shape)):,} cells {tuple(controller.shape.tolist())} "
+          f"in {time.time() - t0:.1f}s -> '{out}' ({os.path.getsize(out) / 1e6:.1f} MB), env {env_kwargs or 'defaults'}")
+
+    # --- VALIDATION REPORT ---
+    torch.manual_seed(0)
+    controller.seed(0)
+    report = validate(controller, policy, env, seeds=range(args.episodes), deterministic=args.deterministic)
+    print(f"\n{'seed':>4} {'yield NN':>9} {'yield table':>12} {'impurity NN':>12} {'impurity table':>15} {'TV dist':>8}")
+    for row in zip(*(report[k] for k in ['seed', 'yield_nn', 'yield_table', 'impurity_nn', 'impurity_table', 'tv_distance'])):
+        print(f"{row[0]:>4} {row[1]*100:>8.2f}% {row[2]*100:>11.2f}% {row[3]*100:>11.2f}% {row[4]*100:>14.2f}% {row[5]:>8.3f}")
+    print(f"\nMean final yield: NN {report['yield_nn'].mean()*100:.2f}% (sd {report['yield_nn'].std()*100:.2f}) | "
+          f"table {report['yield_table'].mean()*100:.2f}% (sd {report['yield_table'].std()*100:.2f})")
+    print(f"Mean reward: NN {report['reward_nn'].mean():.1f} | table {report['reward_table'].mean():.1f}")
+    print(f"Policy TV distance on NN-visited states: {report['tv_distance'].mean():.3f}")
+
+    # Table start-up + one action, no torch involved
+    t0 = time.perf_counter()
+    TableController.load(out).predict(np.zeros(4, dtype=np.float32))
+    print(f"Table load + first action: {(time.perf_counter() - t0)*1e3:.1f} ms")
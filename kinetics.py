@@ -0,0 +1,85 @@
+import numpy as np # type: ignore
+
+# Shared A -> B -> C furnace kinetics (perovskite and alloy furnaces, scalar and batched)
+INTEGRATORS = ("euler", "exact")
+
+def exact_chain(state, k1, k2, dt):
+    """
+    Exact solution of the first-order chain A -k1-> B -k2-> C over one
+    interval dt at constant temperature (constant k1, k2).
+    Works on a (3,) state or an (N, 3) batch (k1, k2 scalars or (N,)).
+    Returns (new_state, formed, consumed): the A->B and B->C amounts.
+    Mass is conserved exactly and fractions stay in [0, 1] for any k*dt.
+    """
+    A, B, C = state[..., 0], state[..., 1], state[..., 2]
+    formed = -A * np.expm1(-k1 * dt)
+    # B made this interval that is still B at the end:
+    # A*k1 * integral_0^dt exp(-k1*s) * exp(-k2*(dt - s)) ds, in a form that never overflows
+    x = np.abs(k1 - k2) * dt
+    phi = np.where(x > 1e-8, -np.expm1(-x) / np.maximum(x, 1e-300), 1.0 - 0.5 * x)
+    kept = A * k1 * dt * np.exp(-np.minimum(k1, k2) * dt) * phi
+    consumed = -B * np.expm1(-k2 * dt) + (formed - kept)
+    new_state = np.stack([A - formed, B * np.exp(-k2 * dt) + kept, C + consumed], axis=-1)
+    return new_state, formed, consumed
+
+class _RateConstant:
+    """Kinetics constant of an ArrheniusRateTable env: assigning it rebuilds the rate table."""
+    def __init__(self, name):
+        self.name = name
+
+    def __get__(self, env, owner=None):
+        if env is None:
+            return self
+        try:
+            return env.__dict__[self.name]
+        except KeyError:
+            raise AttributeError(self.name) from None
+
+    def __set__(self, env, value):
+        env.__dict__[self.name] = value
+        if 'rate_table' in env.__dict__:
+            env.build_rate_table()
+
+class ArrheniusRateTable:
+    """
+    Mixin for the scalar furnace envs: memoized Arrhenius rates.
+    RATE_CONSTANTS lists (pre-exponential, Ea/R) attribute names in the order
+    _rates(T) returns the rate constants, e.g. (('A_form', 'Ea_form_R'), ...).
+    Assigning any of them (env.Ea_form_R = ...) rebuilds the table, so edited
+    kinetics take effect on the next step, as with direct evaluation.
+    """
+    RATE_CONSTANTS = ()
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        for pair in cls.RATE_CONSTANTS:
+            for name in pair:
+                setattr(cls, name, _RateConstant(name))
+
+    def _arrhenius(self, T):
+        return tuple(getattr(self, A) * np.exp(-getattr(self, Ea_R) / T) for A, Ea_R in self.RATE_CONSTANTS)
+
+    def build_rate_table(self):
+        """
+        Arrhenius rates on the temperature grid temp_min + i*temp_step.
+        Heating/cooling moves in whole steps and clips to the grid ends, so
+        every temperature an episode visits is a grid point or (after an
+        off-grid start) a point of that start's own +/-temp_step ladder.
+        Runs at init and whenever a RATE_CONSTANTS attribute is assigned.
+        """
+        grid = np.arange(self.temp_min, self.temp_max + self.temp_step / 2, self.temp_step)
+        # Keyed by the exact temperature: a dict hit is far cheaper than a NumPy scalar exp
+        self.rate_table = dict(zip(grid.tolist(), zip(*self._arrhenius(grid))))
+        self._rates_cache = dict(self.rate_table)
+
+    def _rates(self, T):
+        rates = self._rates_cache.get(T)
+        if rates is None:
+            # Off the grid (e.g. a random or reset(options={'temp': ...}) start): evaluate once, reuse for this episode
+            rates = self._arrhenius(T)
+            self._rates_cache[T] = rates
+        return rates
+
+    def _reset_rates(self):
+        if len(self._rates_cache) > len(self.rate_table):
+            self._rates_cache = dict(self.rate_table) # drop the last episode's off-grid ladder
@@ -7,16 +7,28 @@ import pickle # type: ignore
 import random # type: ignore
 import time # type: ignore
 import os # type: ignore
+import re # type: ignore
+import sys # type: ignore
+import argparse # type: ignore
+import csv # type: ignore
+from concurrent.futures import ProcessPoolExecutor # type: ignore
+import hashlib # type: ignore
+import json # type: ignore
+import sqlite3 # type: ignore
+from collections import OrderedDict # type: ignore
 # Disable multiprocessing for matminer to avoid spawn issues on macOS
 os.environ['JOBLIB_TEMP_FOLDER'] = '/tmp'
-from matminer.featurizers.composition import ElementProperty # type: ignore
-from matminer.featurizers.conversions import StrToComposition # type: ignore
 
 # Get script directory for relative paths
 script_dir = os.path.dirname(os.path.abspath(__file__))
-project_root = script_dir
+project_root = os.path.dirname(script_dir)
 model_dir = os.path.join(project_root, "model")
 
+# Add the model directory to path so imports work from anywhere
+sys.path.insert(0, script_dir)
+from magpie import MagpieFeaturizer, MAGPIE_COLUMNS # Precomputed Magpie statistics (no matminer)
+from flat_judge import FlatJudge # Flattened trees (no sklearn)
+
 # --- CONFIGURATION ---
 # The Periodic Table of "Allowed Moves" (Chalcogenide Focused)
 ACTION_SPACE = {
@@ -27,72 +39,280 @@ ACTION_SPACE = {
 
 # Lazy loading of judge to avoid multiple loads in multiprocessing
 _JUDGE = None
+_JUDGE_HASH = None
+_JUDGE_VERSION = None
+
+JUDGE_PATH = os.path.join(model_dir, "judge_stability.pkl")
+FLAT_JUDGE_PATH = os.path.join(model_dir, "judge_stability") # .<field>.npy + .json from flat_judge.py
+JUDGE_POINTER = os.path.join(model_dir, "judge_current.json") # Written by `judge.py --update`
+CACHE_PATH = os.path.join(model_dir, "stability_cache.sqlite")
+CACHE_SIZE = 4096 # Max formulas held in the in-memory LRU
+
+def _hash_file(path):
+    """SHA-256 of a file's bytes (identifies one trained judge)."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def _judge_version():
+    """Cheap fingerprint of which judge is published (two stat calls)."""
+    stamps = []
+    for path in (JUDGE_POINTER, JUDGE_PATH):
+        try:
+            stamps.append(os.stat(path).st_mtime_ns)
+        except FileNotFoundError:
+            stamps.append(None)
+    return tuple(stamps)
+
+def _published_paths():
+    """(pickle, flat export) of the judge to serve: latest incremental version, else the base model."""
+    if os.path.exists(JUDGE_POINTER):
+        with open(JUDGE_POINTER) as f:
+            pointer = json.load(f)
+        return os.path.join(model_dir, pointer['pkl']), os.path.join(model_dir, pointer['flat'])
+    return JUDGE_PATH, FLAT_JUDGE_PATH
 
 def _load_judge():
-    """Load judge model lazily, only once."""
-    global _JUDGE
-    if _JUDGE is None:
-        judge_path = os.path.join(model_dir, "judge_stability.pkl")
-        with open(judge_path, "rb") as f:
-            _JUDGE = pickle.load(f)
+    """
+    Load judge model lazily, only once per published version.
+    Prefers the memory-mapped FlatJudge export when it was built from the
+    current pickle (batches over FlatJudge.MAX_ROWS still go to the pickle);
+    otherwise unpickles the sklearn model.
+    Hot-swap: when `judge.py --update` publishes a new version (or the base
+    model is retrained) the next call picks it up without a restart.
+    """
+    global _JUDGE, _JUDGE_HASH, _JUDGE_VERSION, _FEATURIZER
+    version = _judge_version()
+    if _JUDGE is None or version != _JUDGE_VERSION:
+        pkl_path, flat_path = _published_paths()
+        judge_hash = _hash_file(pkl_path)
+        judge = None
+        if os.path.exists(f"{flat_path}.json"):
+            try:
+                flat = FlatJudge(flat_path, fallback=pkl_path) # Large batches go to the pickle
+            except (OSError, ValueError):
+                flat = None # Missing or outdated export: serve the pickle
+            if flat is not None and flat.source_hash == judge_hash:
+                judge = flat
+        if judge is None:
+            with open(pkl_path, "rb") as f:
+                judge = pickle.load(f)
+        if _JUDGE is not None and judge_hash != _JUDGE_HASH:
+            print(f"🔄 Judge hot-swapped -> {os.path.basename(pkl_path)}")
+        _JUDGE, _JUDGE_HASH, _JUDGE_VERSION = judge, judge_hash, version
+        _FEATURIZER = None # Re-align columns to the new judge
     return _JUDGE
 
-def get_stability(formula):
+class ScoreCache:
     """
-    Consults the AI Oracle with ROBUST column matching.
+    Two-level memo of judge predictions.
+    - Level 1: bounded in-memory LRU (formula -> score).
+    - Level 2: SQLite table keyed by (judge hash, formula), shared across runs.
+    Rows written by any other judge are dropped on open, so retraining
+    judge_stability.pkl invalidates the cache automatically.
     """
-    # 1. Create a dataframe for the single formula
-    df_single = pd.DataFrame({"formula": [formula]})
-    
-    # 2. Featurize (Chemistry -> Numbers)
-    # Create featurizers fresh each time to avoid multiprocessing issues
-    str_to_comp = StrToComposition()
-    # Force single-threaded by setting internal attribute if possible
-    if hasattr(str_to_comp, '_n_jobs'):
-        str_to_comp._n_jobs = 1
-    df_single = str_to_comp.featurize_dataframe(df_single, "formula")
-    
-    ep_feat = ElementProperty.from_preset(preset_name="magpie")
-    if hasattr(ep_feat, '_n_jobs'):
-        ep_feat._n_jobs = 1
-    X_single = ep_feat.featurize_dataframe(df_single, col_id="composition", ignore_errors=True)
-    
-    # 3. Clean (Keep only numbers)
-    X_single = X_single.select_dtypes(include=[np.number])
-    
-    # --- CRITICAL FIX: ALIGN COLUMNS ---
-    # Load judge lazily
-    judge = _load_judge()
-    
-    # We need to make sure X_single has EXACTLY the same columns as the trained model.
+    def __init__(self, judge_hash, db_path=CACHE_PATH, max_size=CACHE_SIZE):
+        self.judge_hash = judge_hash
+        self.db_path = db_path
+        self.max_size = max_size
+        self.memory = OrderedDict()
+
+        self.db = None
+        if db_path is not None:
+            os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+            self.db = sqlite3.connect(db_path, timeout=30.0)
+            self.db.execute(
+                "CREATE TABLE IF NOT EXISTS stability ("
+                "judge_hash TEXT NOT NULL, formula TEXT NOT NULL, score REAL NOT NULL, "
+                "PRIMARY KEY (judge_hash, formula))"
+            )
+            self.db.execute("DELETE FROM stability WHERE judge_hash != ?", (judge_hash,))
+            self.db.commit()
+
+    def _remember(self, formula, score):
+        self.memory[formula] = score
+        self.memory.move_to_end(formula)
+        while len(self.memory) > self.max_size:
+            self.memory.popitem(last=False)
+
+    def get_many(self, formulas):
+        """Return {formula: score} for every formula already scored."""
+        found = {}
+        missing = []
+        for formula in formulas:
+            if formula in self.memory:
+                self.memory.move_to_end(formula)
+                found[formula] = self.memory[formula]
+            else:
+                missing.append(formula)
+
+        if self.db is not None and missing:
+            # Chunk to stay under SQLite's bound-parameter limit
+            for i in range(0, len(missing), 500):
+                chunk = missing[i:i + 500]
+                marks = ",".join("?" * len(chunk))
+                rows = self.db.execute(
+                    f"SELECT formula, score FROM stability WHERE judge_hash = ? AND formula IN ({marks})",
+                    [self.judge_hash, *chunk],
+                ).fetchall()
+                for formula, score in rows:
+                    self._remember(formula, score)
+                    found[formula] = score
+        return found
+
+    def put_many(self, scores):
+        """Store {formula: score} in both levels."""
+        for formula, score in scores.items():
+            self._remember(formula, float(score))
+        if self.db is not None and scores:
+            self.db.executemany(
+                "INSERT OR REPLACE INTO stability (judge_hash, formula, score) VALUES (?, ?, ?)",
+                [(self.judge_hash, formula, float(score)) for formula, score in scores.items()],
+            )
+            self.db.commit()
+
+_CACHE = None
+
+def _load_cache():
+    """Open the score cache for the currently loaded judge, only once."""
+    global _CACHE
+    _load_judge()
+    if _CACHE is None or _CACHE.judge_hash != _JUDGE_HASH:
+        _CACHE = ScoreCache(_JUDGE_HASH)
+    return _CACHE
+
+def _expected_columns(judge, fallback):
+    """Feature columns the judge was trained on."""
     # Check if the model is a VotingRegressor or a single model
     if hasattr(judge, 'feature_names_in_'):
-        expected_cols = judge.feature_names_in_
-    elif hasattr(judge, 'estimators_'):
+        return judge.feature_names_in_
+    if hasattr(judge, 'estimators_'):
         # If it's an ensemble, grab feature names from the first sub-model
-        expected_cols = judge.estimators_[0].feature_names_in_
-    else:
-        # Fallback: If model doesn't track features (older sklearn), just proceed
-        expected_cols = X_single.columns 
+        return judge.estimators_[0].feature_names_in_
+    # Fallback: If model doesn't track features (older sklearn), just proceed
+    return fallback
 
-    # Reindex forces the columns to match. 
-    # Missing cols become 0. Extra cols are dropped.
-    X_aligned = X_single.reindex(columns=expected_cols, fill_value=0)
-    
-    # 4. Predict
-    return judge.predict(X_aligned)[0]
+# The featurizer is bound to the judge's column order, so build it once
+_FEATURIZER = None
+
+def _load_featurizer():
+    """Build the table-driven Magpie featurizer lazily, only once."""
+    global _FEATURIZER
+    if _FEATURIZER is None:
+        # --- CRITICAL FIX: ALIGN COLUMNS ---
+        # Columns follow the trained model exactly. Missing cols become 0.
+        _FEATURIZER = MagpieFeaturizer(columns=_expected_columns(_load_judge(), MAGPIE_COLUMNS))
+    return _FEATURIZER
+
+def _predict_uncached(formulas):
+    """Featurize and predict a list of formulas in one vectorized pass."""
+    # 1. Featurize (Chemistry -> Numbers), already aligned to the judge
+    X_aligned = _load_featurizer().featurize(formulas)
+
+    # 2. Predict (one call for the whole batch)
+    return np.asarray(_load_judge().predict(X_aligned))
+
+def get_stability_batch(formulas):
+    """
+    Consults the AI Oracle for many formulas in one vectorized pass.
+    Returns an array of predicted e_hull values in the same order.
+    Previously scored formulas are served from the ScoreCache.
+    """
+    formulas = list(formulas)
+    if not formulas:
+        return np.empty(0)
+
+    cache = _load_cache()
+    scores = cache.get_many(formulas)
+
+    # Only featurize formulas never seen by this judge (deduplicated)
+    missing = list(dict.fromkeys(f for f in formulas if f not in scores))
+    if missing:
+        fresh = dict(zip(missing, _predict_uncached(missing)))
+        cache.put_many(fresh)
+        scores.update(fresh)
+
+    return np.array([scores[f] for f in formulas], dtype=float)
+
+def get_stability(formula):
+    """
+    Consults the AI Oracle with ROBUST column matching.
+    """
+    return get_stability_batch([formula])[0]
+
+class StabilityLattice:
+    """
+    Enumeration Mode: scores the whole ACTION_SPACE cartesian product once.
+    Scores live in a dense (n_A, n_B, n_X) array indexed by site, so walkers
+    look candidates up in O(1) instead of calling the judge.
+    Large action spaces are streamed through the judge in chunks.
+    """
+    SITES = ['A_SITE', 'B_SITE', 'X_SITE']
+
+    def __init__(self, action_space=ACTION_SPACE, chunk_size=4096):
+        self.elements = [list(action_space[site]) for site in self.SITES]
+        self.index = [{el: i for i, el in enumerate(els)} for els in self.elements]
+        self.shape = tuple(len(els) for els in self.elements)
+        self.scores = np.empty(self.shape)
+
+        # Stream the flat enumeration through the judge chunk by chunk
+        flat = self.scores.reshape(-1)
+        for start in range(0, flat.size, chunk_size):
+            stop = min(start + chunk_size, flat.size)
+            flat[start:stop] = _predict_uncached(self.formulas(np.arange(start, stop)))
+
+    def formulas(self, flat_idx):
+        """Formulas for flat lattice positions (C order: A, then B, then X)."""
+        a_idx, b_idx, x_idx = np.unravel_index(flat_idx, self.shape)
+        A, B, X = self.elements
+        return [f"{A[a]}{B[b]}{X[x]}3" for a, b, x in zip(a_idx, b_idx, x_idx)]
+
+    def locate(self, formula):
+        """(a, b, x) lattice indices of an ABX3 formula, or None if off-lattice."""
+        elements = re.findall(r'([A-Z][a-z]*)', formula)
+        if len(elements) != 3 or not formula.endswith(f"{elements[2]}3"):
+            return None
+        try:
+            return tuple(self.index[site][el] for site, el in enumerate(elements))
+        except KeyError:
+            return None
+
+    def score(self, formula):
+        """O(1) lookup; off-lattice formulas fall back to the judge."""
+        idx = self.locate(formula)
+        if idx is None:
+            return get_stability(formula)
+        return self.scores[idx]
+
+    def ranking(self, top=None):
+        """Global ranking of the whole lattice (most stable first)."""
+        order = np.argsort(self.scores, axis=None, kind='stable')
+        if top is not None:
+            order = order[:top]
+        return pd.DataFrame({
+            'rank': np.arange(1, len(order) + 1),
+            'formula': self.formulas(order),
+            'score': self.scores.reshape(-1)[order],
+        })
 
 class PerovskiteWalker:
-    def __init__(self, start_formula):
+    def __init__(self, start_formula, lattice=None, temperature=0.05, seed=None):
         self.start_formula = start_formula
         self.current_formula = start_formula
-        self.current_stability = get_stability(start_formula)
+        self.temperature = temperature # Metropolis temperature (eV)
+        # Each walker owns its RNG so parallel workers don't replay the same moves
+        self.rng = random.Random(seed)
+        # Enumeration Mode: look scores up in a precomputed StabilityLattice
+        self.score = lattice.score if lattice is not None else get_stability
+        self.current_stability = self.score(start_formula)
         self.best_formula = start_formula
         self.best_stability = self.current_stability
         self.history = [] # To save the path
+        self.steps_taken = 0
     
     def parse_formula(self, formula):
-        import re
         # Heuristic parser for ABX3
         elements = re.findall(r'([A-Z][a-z]*)', formula)
         return elements
@@ -103,71 +323,307 @@ class PerovskiteWalker:
         if len(elements) < 3: return self.current_formula
         
         # 2. Pick a site to mutate
-        site = random.choice(['A', 'B', 'X'])
+        site = self.rng.choice(['A', 'B', 'X'])
         new_elements = elements.copy()
         
         # 3. Swap element
-        if site == 'A': new_elements[0] = random.choice(ACTION_SPACE['A_SITE'])
-        elif site == 'B': new_elements[1] = random.choice(ACTION_SPACE['B_SITE'])
-        elif site == 'X': new_elements[2] = random.choice(ACTION_SPACE['X_SITE'])
+        if site == 'A': new_elements[0] = self.rng.choice(ACTION_SPACE['A_SITE'])
+        elif site == 'B': new_elements[1] = self.rng.choice(ACTION_SPACE['B_SITE'])
+        elif site == 'X': new_elements[2] = self.rng.choice(ACTION_SPACE['X_SITE'])
             
         # 4. Construct
         return f"{new_elements[0]}{new_elements[1]}{new_elements[2]}3"
 
+    def step(self):
+        """One Metropolis move. Step numbers continue across calls."""
+        i = self.steps_taken
+        self.steps_taken += 1
+
+        # Propose Mutation
+        candidate = self.mutate()
+        score = self.score(candidate)
+        
+        # Acceptance Probability (Metropolis-like)
+        # We accept better moves always.
+        # We accept worse moves sometimes to escape local traps.
+        diff = score - self.current_stability
+        prob = np.exp(-diff / self.temperature)
+        
+        if diff < 0 or self.rng.random() < prob:
+            # Move Accepted
+            self.current_formula = candidate
+            self.current_stability = score
+            
+            # Check if it's a new Champion
+            if score < self.best_stability:
+                self.best_stability = score
+                self.best_formula = candidate
+                print(f"Step {i:03}: 🌟 NEW CHAMPION: {candidate} (e_hull: {score:.4f})")
+        
+        # Log Data
+        self.history.append({
+            'step': i,
+            'formula': candidate,
+            'score': score,
+            'accepted': (self.current_formula == candidate),
+            'current': self.current_formula
+        })
+
     def walk(self, steps=200):
         print(f"🚀 LAUNCHING AGENT from {self.start_formula} (Stability: {self.current_stability:.3f} eV)")
         
-        for i in range(steps):
-            # Propose Mutation
-            candidate = self.mutate()
-            score = get_stability(candidate)
-            
-            # Acceptance Probability (Metropolis-like)
-            # We accept better moves always.
-            # We accept worse moves sometimes to escape local traps.
-            diff = score - self.current_stability
-            prob = np.exp(-diff / 0.05) # Temperature = 0.05 eV
-            
-            if diff < 0 or random.random() < prob:
-                # Move Accepted
-                self.current_formula = candidate
-                self.current_stability = score
-                
-                # Check if it's a new Champion
-                if score < self.best_stability:
-                    self.best_stability = score
-                    self.best_formula = candidate
-                    print(f"Step {i:03}: 🌟 NEW CHAMPION: {candidate} (e_hull: {score:.4f})")
-            
-            # Log Data
-            self.history.append({
-                'step': i,
-                'formula': candidate,
-                'score': score,
-                'accepted': (self.current_formula == candidate)
-            })
+        for _ in range(steps):
+            self.step()
 
         print(f"\n🏁 MISSION COMPLETE.")
         print(f"Top Discovery: {self.best_formula}")
         return pd.DataFrame(self.history)
 
+# --- STREAMING LOG ---
+class DiscoveryLog:
+    """
+    Append-only discovery log (chunked CSV).
+    Step records are buffered and appended to disk every `flush_every` rows
+    (WalkerPool.run also flushes after every round), so memory stays bounded
+    and a crash loses at most the round in progress.
+    With resume=True the existing file is kept and last_states() recovers
+    where every walker stopped. Logs written before the `current` /
+    `temperature` columns existed are migrated in place first.
+    """
+    COLUMNS = ['step', 'formula', 'score', 'accepted', 'current', 'seed', 'temperature']
+    LEGACY_COLUMNS = ['step', 'formula', 'score', 'accepted', 'seed']
+    DEFAULT_TEMPERATURE = 0.05 # PerovskiteWalker default, used by every pre-tempering log
+
+    def __init__(self, path, flush_every=1000, resume=False):
+        self.path = path
+        self.flush_every = flush_every
+        self.buffer = []
+        if not resume or not os.path.exists(path):
+            with open(path, "w", newline="") as f:
+                csv.writer(f).writerow(self.COLUMNS)
+            return
+
+        with open(path, newline="") as f:
+            header = next(csv.reader(f), [])
+        if header == self.LEGACY_COLUMNS:
+            self._migrate()
+        elif header != self.COLUMNS:
+            raise ValueError(f"Cannot resume from '{path}': unknown columns {header} "
+                             f"(expected {self.COLUMNS}); move it aside or run without --resume")
+
+    def _migrate(self):
+        """Rewrites a legacy log under the current header (no `current`, default temperature)."""
+        tmp_path = f"{self.path}.tmp"
+        with open(self.path, newline="") as src, open(tmp_path, "w", newline="") as dst:
+            writer = csv.DictWriter(dst, fieldnames=self.COLUMNS)
+            writer.writeheader()
+            for row in csv.DictReader(src):
+                writer.writerow({**row, 'current': '', 'temperature': self.DEFAULT_TEMPERATURE})
+        os.replace(tmp_path, self.path)
+        print(f"Migrated '{self.path}' to the {len(self.COLUMNS)}-column log format")
+
+    def write(self, records):
+        self.buffer.extend(records)
+        if len(self.buffer) >= self.flush_every:
+            self.flush()
+
+    def flush(self):
+        if not self.buffer:
+            return
+        with open(self.path, "a", newline="") as f:
+            writer = csv.DictWriter(f, fieldnames=self.COLUMNS, extrasaction='ignore')
+            writer.writerows(self.buffer)
+            f.flush()
+            os.fsync(f.fileno())
+        self.buffer = []
+
+    def close(self):
+        self.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def last_states(self):
+        """
+        Streams the log once and returns, per (seed, temperature) walker:
+        {'steps': n, 'current': formula, 'best_formula': f, 'best_score': s}.
+        """
+        states = {}
+        with open(self.path, newline="") as f:
+            for row in csv.DictReader(f):
+                key = (row['seed'], float(row.get('temperature') or self.DEFAULT_TEMPERATURE))
+                state = states.setdefault(key, {'steps': 0, 'current': row['seed'],
+                                                'best_formula': None, 'best_score': np.inf})
+                accepted = row['accepted'] == 'True'
+                state['steps'] = max(state['steps'], int(row['step']) + 1)
+                if row.get('current'):
+                    state['current'] = row['current']
+                elif accepted:
+                    state['current'] = row['formula']
+                if accepted and float(row['score']) < state['best_score']:
+                    state['best_formula'], state['best_score'] = row['formula'], float(row['score'])
+        return states
+
+# --- PARALLEL DISCOVERY ---
+def _init_worker():
+    """Process pool initializer: load the judge once per worker."""
+    global _CACHE
+    # A forked worker must not reuse the parent's SQLite connection
+    _CACHE = None
+    _load_judge()
+
+def _advance_walker(walker, steps):
+    """Runs in a worker: advance one walker and ship it back."""
+    for _ in range(steps):
+        walker.step()
+    return walker
+
+class WalkerPool:
+    """
+    Runs N PerovskiteWalkers across a process pool.
+    - Every worker loads the judge once (via _load_judge) and shares the
+      on-disk ScoreCache (or a StabilityLattice), so a formula scored by one
+      walker is never re-featurized by another.
+    - Parallel Tempering: with exchange_every set, walkers at adjacent
+      temperatures try to swap states after every round (replica exchange).
+    """
+    def __init__(self, seeds, temperatures=None, n_workers=None, lattice=None):
+        if temperatures is None:
+            temperatures = [0.05] * len(seeds)
+        if len(seeds) == 1 and len(temperatures) > 1:
+            seeds = seeds * len(temperatures)
+        if len(seeds) != len(temperatures):
+            raise ValueError("Need one temperature per seed")
+
+        self.seeds = list(seeds)
+        self.n_workers = n_workers or min(len(seeds), os.cpu_count() or 1)
+        self.walkers = [PerovskiteWalker(seed, lattice=lattice, temperature=T)
+                        for seed, T in zip(seeds, temperatures)]
+        self.rng = random.Random()
+        self.swaps_tried = 0
+        self.swaps_accepted = 0
+
+    def exchange(self, offset):
+        """Metropolis swap between neighbouring temperatures (even/odd pairs)."""
+        # Replicas of the same seed form one temperature ladder
+        ladders = {}
+        for k, seed in enumerate(self.seeds):
+            ladders.setdefault(seed, []).append(k)
+        pairs = []
+        for ladder in ladders.values():
+            ladder.sort(key=lambda k: self.walkers[k].temperature)
+            pairs += zip(ladder[offset::2], ladder[offset + 1::2])
+
+        for i, j in pairs:
+            wi, wj = self.walkers[i], self.walkers[j]
+            # P(swap) = min(1, exp((1/T_i - 1/T_j) * (E_i - E_j)))
+            delta = (1.0 / wi.temperature - 1.0 / wj.temperature) * (wi.current_stability - wj.current_stability)
+            self.swaps_tried += 1
+            if delta >= 0 or self.rng.random() < np.exp(delta):
+                self.swaps_accepted += 1
+                wi.current_formula, wj.current_formula = wj.current_formula, wi.current_formula
+                wi.current_stability, wj.current_stability = wj.current_stability, wi.current_stability
+                for w in (wi, wj):
+                    if w.current_stability < w.best_stability:
+                        w.best_formula, w.best_stability = w.current_formula, w.current_stability
+
+    def restore(self, states):
+        """Resume walkers from DiscoveryLog.last_states()."""
+        for seed, walker in zip(self.seeds, self.walkers):
+            state = states.get((seed, walker.temperature))
+            if state is None:
+                continue
+            walker.steps_taken = state['steps']
+            walker.current_formula = state['current']
+            walker.current_stability = walker.score(state['current'])
+            if state['best_score'] < walker.best_stability:
+                walker.best_formula, walker.best_stability = state['best_formula'], state['best_score']
+        print(f"Resumed {sum(w.steps_taken > 0 for w in self.walkers)} walkers "
+              f"at step {min(w.steps_taken for w in self.walkers)}")
+
+    def _records(self):
+        """Tag every walker's history with its seed and temperature."""
+        for seed, walker in zip(self.seeds, self.walkers):
+            for record in walker.history:
+                yield {**record, 'seed': seed, 'temperature': walker.temperature}
+
+    def run(self, steps=100, exchange_every=None, log=None, log_every=50):
+        """
+        Advance every walker until it has taken `steps` steps.
+        Without a log, returns the combined history. With a DiscoveryLog,
+        records are streamed to it every round and not kept in memory.
+        """
+        round_len = exchange_every or (log_every if log is not None else steps)
+        with ProcessPoolExecutor(max_workers=self.n_workers, initializer=_init_worker) as pool:
+            done = min(w.steps_taken for w in self.walkers)
+            while done < steps:
+                n = min(round_len, steps - done)
+                self.walkers = list(pool.map(_advance_walker, self.walkers, [n] * len(self.walkers)))
+                done += n
+                if log is not None:
+                    log.write(self._records())
+                    log.flush() # A crash loses at most the round in progress
+                    for walker in self.walkers:
+                        walker.history = []
+                if exchange_every and done < steps:
+                    self.exchange(offset=(done // round_len) % 2)
+
+        if exchange_every:
+            print(f"Replica exchange: {self.swaps_accepted}/{self.swaps_tried} swaps accepted")
+
+        for seed, walker in zip(self.seeds, self.walkers):
+            print(f"Walker {seed} @ T={walker.temperature:.3f} eV -> Top Discovery: {walker.best_formula} "
+                  f"(e_hull: {walker.best_stability:.4f})")
+        if log is None:
+            return pd.DataFrame(list(self._records()), columns=DiscoveryLog.COLUMNS)
+
 if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Perovskite discovery agent")
+    parser.add_argument("--enumerate", action="store_true",
+                        help="Score the whole ACTION_SPACE once and report the global ranking")
+    parser.add_argument("--top", type=int, default=10, help="Ranking entries to print in --enumerate mode")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes (default: one per walker)")
+    parser.add_argument("--temperatures", type=float, nargs="+", default=None,
+                        help="Temperature ladder (eV) for parallel tempering, e.g. 0.02 0.05 0.1")
+    parser.add_argument("--exchange-every", type=int, default=None,
+                        help="Steps between replica-exchange attempts")
+    parser.add_argument("--steps", type=int, default=100, help="Steps per walker")
+    parser.add_argument("--resume", action="store_true",
+                        help="Continue an interrupted campaign from data/discovery_log.csv")
+    args = parser.parse_args()
+
     # Load judge once at startup
     print("Loading The Judge...")
     _load_judge()
+
+    lattice = None
+    if args.enumerate:
+        t0 = time.time()
+        lattice = StabilityLattice()
+        print(f"Enumerated {lattice.scores.size} formulas in {time.time() - t0:.2f}s")
+        print(f"\n🏆 GLOBAL RANKING (Top {args.top}):")
+        print(lattice.ranking(top=args.top).to_string(index=False))
+        print()
     
     # --- RUN THE EXPERIMENT ---
-    # We run 3 walkers starting from different "Actionable" seeds
+    # We run 3 walkers starting from different "Actionable" seeds, one per worker
     seeds = ["BaHfS3", "SrHfS3", "EuTiS3"]
-    all_results = []
-
-    for seed in seeds:
-        agent = PerovskiteWalker(seed)
-        df_history = agent.walk(steps=100)
-        df_history['seed'] = seed
-        all_results.append(df_history)
-
-    # Save Results
-    final_df = pd.concat(all_results)
-    final_df.to_csv(os.path.join(project_root, "data", "discovery_log.csv"), index=False)
-    print(f"\nData saved to '{os.path.join(project_root, 'data', 'discovery_log.csv')}'")
\ No newline at end of file
+    if args.temperatures:
+        # Parallel Tempering: every seed is replicated across the temperature ladder
+        seeds = [seed for seed in seeds for _ in args.temperatures]
+        temperatures = list(args.temperatures) * (len(seeds) // len(args.temperatures))
+    else:
+        temperatures = None
+
+    pool = WalkerPool(seeds, temperatures=temperatures, n_workers=args.workers, lattice=lattice)
+
+    # Save Results (streamed to disk while the walkers run)
+    log_path = os.path.join(project_root, "data", "discovery_log.csv")
+    with DiscoveryLog(log_path, resume=args.resume) as log:
+        if args.resume:
+            pool.restore(log.last_states())
+        pool.run(steps=args.steps, exchange_every=args.exchange_every, log=log)
+    print(f"\nData saved to '{log_path}'")
\ No newline at end of file
@@ -3,21 +3,36 @@ warnings.filterwarnings('ignore')
 
 import pandas as pd # type: ignore
 import numpy as np # type: ignore
-from matminer.featurizers.composition import ElementProperty # type: ignore
-from matminer.featurizers.conversions import StrToComposition # type: ignore
 from sklearn.ensemble import RandomForestRegressor, HistGradientBoostingRegressor # type: ignore
-from sklearn.model_selection import train_test_split, KFold, cross_val_score # type: ignore
-from sklearn.metrics import r2_score, mean_absolute_error, confusion_matrix, classification_report # type: ignore
+from sklearn.model_selection import train_test_split # type: ignore
+from sklearn.metrics import r2_score, mean_absolute_error, classification_report # type: ignore
+from concurrent.futures import ProcessPoolExecutor # type: ignore
+import argparse # type: ignore
 import pickle # type: ignore
+import hashlib # type: ignore
+import json # type: ignore
+import sys # type: ignore
 import os # type: ignore
 
 # Get script directory for relative paths
 script_dir = os.path.dirname(os.path.abspath(__file__))
 project_root = os.path.dirname(script_dir)
 
-if __name__ == '__main__':
-    # 1. Load your local dataset
-    csv_path = os.path.join(project_root, "data", "perovskite_metadata.csv")
+# Add the model directory to path so imports work from anywhere
+sys.path.insert(0, script_dir)
+from flat_judge import export_flat, ResidualJudge # Flattened trees for fast inference in agent.py
+from magpie import MAGPIE_COLUMNS # Column order produced by ElementProperty "magpie"
+
+CSV_PATH = os.path.join(project_root, "data", "perovskite_metadata.csv")
+FEATURE_CACHE_DIR = os.path.join(script_dir, "feature_cache")
+FEATURIZER_TAG = "matminer-magpie-v1" # Bump to invalidate every cached feature matrix
+
+STABILITY_PATH = os.path.join(script_dir, "judge_stability.pkl")
+VERSIONS_DIR = os.path.join(script_dir, "versions")
+POINTER_PATH = os.path.join(script_dir, "judge_current.json") # Read by agent.py:_load_judge
+
+def load_specialist_dataset(csv_path=CSV_PATH):
+    """Steps 1-2: chalcogenide/halide specialist subset, one row per formula."""
     df = pd.read_csv(csv_path)
     print(f"Original Dataset: {len(df)} materials")
 
@@ -34,16 +49,247 @@ if __name__ == '__main__':
     # Keep only the most stable entry for each formula
     df_clean = df_specialist.sort_values('e_hull', ascending=True).drop_duplicates(subset='formula', keep='first')
     print(f"Final Clean Training Set: {len(df_clean)} unique formulas")
+    return df_clean
 
-    # 2. Featurize
-    print("Featurizing...")
-    df_clean = StrToComposition().featurize_dataframe(df_clean, "formula")
+def _featurize_chunk(formulas):
+    """Runs in a worker: matminer Magpie features for one chunk of formulas."""
+    from matminer.featurizers.composition import ElementProperty # type: ignore
+    from matminer.featurizers.conversions import StrToComposition # type: ignore
+
+    str_to_comp = StrToComposition()
+    str_to_comp.set_n_jobs(1)
     ep_feat = ElementProperty.from_preset(preset_name="magpie")
+    ep_feat.set_n_jobs(1)
     # IonProperty is great, but can be noisy. Let's trust Magpie for now if Ion fails.
-    X = ep_feat.featurize_dataframe(df_clean, col_id="composition")
+    df_chunk = str_to_comp.featurize_dataframe(pd.DataFrame({"formula": formulas}), "formula", pbar=False)
+    X_chunk = ep_feat.featurize_dataframe(df_chunk, col_id="composition", pbar=False)
+    return X_chunk[MAGPIE_COLUMNS].to_numpy(dtype=np.float64)
+
+def featurize(formulas, n_jobs=None, chunk_size=256):
+    """Chunked multiprocess featurization -> (n_formulas, 132) array."""
+    formulas = list(formulas)
+    chunks = [formulas[i:i + chunk_size] for i in range(0, len(formulas), chunk_size)]
+    with ProcessPoolExecutor(max_workers=n_jobs) as pool:
+        parts = list(pool.map(_featurize_chunk, chunks))
+    return np.vstack(parts) if parts else np.empty((0, len(MAGPIE_COLUMNS)))
+
+def _hash_file(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def _feature_key(csv_path):
+    return hashlib.sha256(f"{_hash_file(csv_path)}:{FEATURIZER_TAG}".encode()).hexdigest()[:16]
+
+def load_features(df_clean, csv_path=CSV_PATH, cache_dir=FEATURE_CACHE_DIR, n_jobs=None):
+    """
+    Feature matrix for df_clean, persisted as `<key>.npy` + `<key>.json` (column manifest).
+    The key hashes the source CSV and the featurizer, so retraining after a
+    hyperparameter change skips featurization entirely.
+    """
+    key = _feature_key(csv_path)
+    npy_path = os.path.join(cache_dir, f"{key}.npy")
+    manifest_path = os.path.join(cache_dir, f"{key}.json")
+    formulas = df_clean['formula'].tolist()
+
+    if os.path.exists(npy_path) and os.path.exists(manifest_path):
+        with open(manifest_path) as f:
+            manifest = json.load(f)
+        if manifest['formulas'] == formulas:
+            print(f"Loading cached features ({key})...")
+            values = np.load(npy_path, mmap_mode='r')
+            return pd.DataFrame(values, columns=manifest['columns'], index=df_clean.index)
+
+    print("Featurizing...")
+    values = featurize(formulas, n_jobs=n_jobs)
+    os.makedirs(cache_dir, exist_ok=True)
+    np.save(npy_path, values)
+    with open(manifest_path, "w") as f:
+        json.dump({'csv_sha256': _hash_file(csv_path), 'featurizer': FEATURIZER_TAG,
+                   'columns': MAGPIE_COLUMNS, 'formulas': formulas}, f)
+    return pd.DataFrame(values, columns=MAGPIE_COLUMNS, index=df_clean.index)
+
+def append_update_rows(df_new, df_clean, csv_path=CSV_PATH, cache_dir=FEATURE_CACHE_DIR):
+    """
+    Adds newly labeled rows (formula, e_hull) to the update store kept next to
+    the cached feature matrix (`<key>_updates.npy` + `.json`). Only formulas
+    not already stored are featurized; a newer label replaces an older one.
+    Formulas in the base dataset are skipped (edit the CSV and retrain instead).
+    Returns the full update set as (X, y).
+    """
+    stem = os.path.join(cache_dir, f"{_feature_key(csv_path)}_updates")
+    formulas, labels, values = [], [], np.empty((0, len(MAGPIE_COLUMNS)))
+    if os.path.exists(f"{stem}.npy"):
+        with open(f"{stem}.json") as f:
+            manifest = json.load(f)
+        formulas, labels = manifest['formulas'], manifest['e_hull']
+        values = np.load(f"{stem}.npy")
+
+    known = set(df_clean['formula'])
+    df_new = df_new.drop_duplicates(subset='formula', keep='last')
+    skipped = df_new['formula'].isin(known)
+    if skipped.any():
+        print(f"Skipping {int(skipped.sum())} formulas already in the base dataset")
+    df_new = df_new[~skipped]
+
+    position = {f: i for i, f in enumerate(formulas)}
+    fresh = [f for f in df_new['formula'] if f not in position]
+    if fresh:
+        print(f"Featurizing {len(fresh)} new formulas...")
+        values = np.vstack([values, featurize(fresh)])
+        for f in fresh:
+            position[f] = len(formulas)
+            formulas.append(f)
+            labels.append(None)
+    for f, e_hull in zip(df_new['formula'], df_new['e_hull']):
+        labels[position[f]] = float(e_hull)
+
+    os.makedirs(cache_dir, exist_ok=True)
+    np.save(f"{stem}.npy", values)
+    with open(f"{stem}.json", "w") as f:
+        json.dump({'columns': MAGPIE_COLUMNS, 'formulas': formulas, 'e_hull': labels}, f)
+    return pd.DataFrame(values, columns=MAGPIE_COLUMNS), pd.Series(labels, name='e_hull')
+
+def current_stability_path():
+    """Pickle of the judge agent.py is serving (latest published version, else the base model)."""
+    if os.path.exists(POINTER_PATH):
+        with open(POINTER_PATH) as f:
+            return os.path.join(script_dir, json.load(f)['pkl'])
+    return STABILITY_PATH
+
+def publish_version(model):
+    """
+    Writes versions/judge_stability.vNNN.{pkl,json} + the flat node columns, then atomically
+    repoints judge_current.json, which running agents pick up on their next call.
+    """
+    os.makedirs(VERSIONS_DIR, exist_ok=True)
+    existing = [f for f in os.listdir(VERSIONS_DIR) if f.startswith("judge_stability.v") and f.endswith(".pkl")]
+    version = 1 + max((int(f[len("judge_stability.v"):-len(".pkl")]) for f in existing), default=0)
+    stem = f"judge_stability.v{version:03d}"
+
+    pkl_path = os.path.join(VERSIONS_DIR, f"{stem}.pkl")
+    with open(pkl_path, "wb") as f:
+        pickle.dump(model, f)
+    export_flat(model, os.path.join(VERSIONS_DIR, stem), source_hash=_hash_file(pkl_path))
+
+    tmp_path = f"{POINTER_PATH}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump({'version': version, 'pkl': os.path.join("versions", f"{stem}.pkl"),
+                   'flat': os.path.join("versions", stem)}, f)
+    os.replace(tmp_path, POINTER_PATH)
+    return version
+
+def fit_residual(base, X_base, X_upd, y_upd, extra_iter=100):
+    """
+    Additive correction on top of a fixed base judge: a small booster fit on
+    y - base.predict(X) for the update rows, with the base training rows
+    included as zero-residual anchors (the base already fits them, and
+    re-boosting their leftover noise only overfits). The base trees and their
+    binning are never touched, so labels that agree with the base leave the
+    judge unchanged. Returns ResidualJudge(base, booster).
+    """
+    X_fit = pd.concat([X_base, X_upd], ignore_index=True)
+    target = np.concatenate([np.zeros(len(X_base)), np.asarray(y_upd, dtype=np.float64) - base.predict(X_upd)])
+    residual = HistGradientBoostingRegressor(
+        learning_rate=base.learning_rate,
+        max_iter=extra_iter,
+        max_depth=base.max_depth,
+        l2_regularization=base.l2_regularization,
+        early_stopping=False,
+        random_state=42
+    )
+    residual.fit(X_fit, target)
+    return ResidualJudge(base, residual)
+
+def _base_judge():
+    """The served judge without any published residual."""
+    with open(current_stability_path(), "rb") as f:
+        model = pickle.load(f)
+    return model, getattr(model, 'base', model)
+
+def update_judge(df_new, extra_iter=100):
+    """
+    Incremental mode: append new labeled rows to the feature store and fit a
+    residual booster (extra_iter trees) on top of the base judge over every
+    update so far, instead of refitting from scratch. Publishes base + residual
+    as a new judge version.
+    """
+    df_clean = load_specialist_dataset()
+    X = load_features(df_clean)
+    X_train, X_test, y_train, y_test = train_test_split(X, df_clean['e_hull'], test_size=0.1, random_state=42)
+    X_upd, y_upd = append_update_rows(df_new, df_clean)
+
+    current, base = _base_judge()
+    mae_before = mean_absolute_error(y_test, current.predict(X_test))
+    train_before = mean_absolute_error(y_train, current.predict(X_train))
+
+    print(f"Boosting {extra_iter} residual trees on {len(X_train) + len(X_upd)} rows ({len(X_upd)} from updates)...")
+    model = fit_residual(base, X_train, X_upd, y_upd, extra_iter=extra_iter)
+    mae_after = mean_absolute_error(y_test, model.predict(X_test))
+    train_after = mean_absolute_error(y_train, model.predict(X_train))
+
+    version = publish_version(model)
+    print(f"Training MAE: {train_before:.4f} -> {train_after:.4f} eV/atom")
+    print(f"Held-out MAE: {mae_before:.4f} -> {mae_after:.4f} eV/atom")
+    print(f"Published judge v{version:03d} ({base.n_iter_} base + {model.residual.n_iter_} residual trees)")
+    return model
+
+def check_update(n_rows=60, extra_iter=100, seed=0):
+    """
+    Self-check for update_judge: appends n_rows ACTION_SPACE formulas labeled
+    with the base judge's own predictions (no new information) and verifies
+    that neither training nor held-out MAE gets worse. Nothing is published.
+    """
+    import itertools
+    from agent import ACTION_SPACE # type: ignore
+
+    df_clean = load_specialist_dataset()
+    X = load_features(df_clean)
+    X_train, X_test, y_train, y_test = train_test_split(X, df_clean['e_hull'], test_size=0.1, random_state=42)
+    _, base = _base_judge()
+
+    formulas = ["".join(sites) + "3" for sites in itertools.product(
+        ACTION_SPACE['A_SITE'], ACTION_SPACE['B_SITE'], ACTION_SPACE['X_SITE'])]
+    formulas = list(np.random.default_rng(seed).choice(formulas, n_rows, replace=False))
+    X_upd = pd.DataFrame(featurize(formulas), columns=MAGPIE_COLUMNS)
+    model = fit_residual(base, X_train, X_upd, base.predict(X_upd), extra_iter=extra_iter)
+
+    ok = True
+    for name, X_eval, y_eval in (("Training", X_train, y_train), ("Held-out", X_test, y_test)):
+        before = mean_absolute_error(y_eval, base.predict(X_eval))
+        after = mean_absolute_error(y_eval, model.predict(X_eval))
+        ok &= after <= before
+        print(f"{name} MAE: {before:.6f} -> {after:.6f} eV/atom")
+    print(">> Zero-information update: " + ("PASS" if ok else "FAIL (update worsened the judge)"))
+    return ok
 
-    # Drop metadata
-    X = X.select_dtypes(include=[np.number]).drop(columns=["e_hull", "formation_energy", "band_gap"], errors='ignore')
+def _fit(model, X, y):
+    """Runs in a worker: fit one model and ship it back."""
+    return model.fit(X, y)
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Train (or incrementally update) The Judge")
+    parser.add_argument("--update", metavar="CSV", default=None,
+                        help="New labeled rows (formula, e_hull) to fit a residual booster on")
+    parser.add_argument("--extra-iter", type=int, default=100, help="Residual trees per --update")
+    parser.add_argument("--check-update", action="store_true",
+                        help="Verify that a zero-information update leaves training / held-out MAE no worse")
+    args = parser.parse_args()
+
+    if args.check_update:
+        sys.exit(0 if check_update(extra_iter=args.extra_iter) else 1)
+
+    if args.update:
+        update_judge(pd.read_csv(args.update)[['formula', 'e_hull']], extra_iter=args.extra_iter)
+        sys.exit(0)
+
+    # 1. Load your local dataset (filtered + deduplicated)
+    df_clean = load_specialist_dataset()
+
+    # 2. Featurize (cached by dataset hash)
+    X = load_features(df_clean)
 
     # 3. Define Targets
     y_stability = df_clean['e_hull']    # Stability Target
@@ -52,18 +298,23 @@ if __name__ == '__main__':
     # 4. Train/Test Split for Stability Model
     X_train_stab, X_test_stab, y_train_stab, y_test_stab = train_test_split(X, y_stability, test_size=0.1, random_state=42)
 
-    # 5. Train The Specialist
+    # 5. Train The Specialist and the Bandgap Model concurrently
     # HistGradientBoosting is generally the SOTA for tabular data like this
     model_stability = HistGradientBoostingRegressor(
-        learning_rate=0.05, 
-        max_iter=1000, 
-        max_depth=15, 
+        learning_rate=0.05,
+        max_iter=1000,
+        max_depth=15,
         l2_regularization=0.1,
         random_state=42
     )
+    reg_bandgap = RandomForestRegressor(n_estimators=100, random_state=67)
 
-    print("Training Judge 4.0 (Specialist)...")
-    model_stability.fit(X_train_stab, y_train_stab)
+    print("Training Judge 4.0 (Specialist) + Bandgap Model...")
+    with ProcessPoolExecutor(max_workers=2) as pool:
+        fut_stability = pool.submit(_fit, model_stability, X_train_stab, y_train_stab)
+        fut_bandgap = pool.submit(_fit, reg_bandgap, X, y_bandgap)
+        model_stability = fut_stability.result()
+        reg_bandgap = fut_bandgap.result()
 
     # 6. Evaluate Stability Model (The Real Test)
     y_pred_stab = model_stability.predict(X_test_stab)
@@ -91,17 +342,19 @@ if __name__ == '__main__':
     else:
         print(">> STATUS: YELLOW. Caution advised on close calls.")
 
-    # 7. Train Bandgap Model
-    print("\nTraining Bandgap Model...")
-    reg_bandgap = RandomForestRegressor(n_estimators=100, random_state=67)
-    reg_bandgap.fit(X, y_bandgap)
-
-    # 8. Save the brains (using original file names)
-    stability_path = os.path.join(script_dir, "judge_stability.pkl")
+    # 7. Save the brains (using original file names)
+    stability_path = STABILITY_PATH
     bandgap_path = os.path.join(script_dir, "judge_bandgap.pkl")
     with open(stability_path, "wb") as f:
         pickle.dump(model_stability, f)
     with open(bandgap_path, "wb") as f:
         pickle.dump(reg_bandgap, f)
 
-    print("\nSUCCESS: 'The Judge' is trained and saved.")
\ No newline at end of file
+    # 8. Export flattened stability trees (memory-mapped by agent.py, no sklearn needed)
+    export_flat(model_stability, os.path.join(script_dir, "judge_stability"), source_hash=_hash_file(stability_path))
+
+    # A full retrain supersedes any incrementally published version
+    if os.path.exists(POINTER_PATH):
+        os.remove(POINTER_PATH)
+
+    print("\nSUCCESS: 'The Judge' is trained and saved.")
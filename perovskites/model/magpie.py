@@ -0,0 +1,148 @@
+import re # type: ignore
+import os # type: ignore
+import numpy as np # type: ignore
+
+# Get script directory for relative paths
+script_dir = os.path.dirname(os.path.abspath(__file__))
+TABLE_PATH = os.path.join(script_dir, "magpie_table.npz")
+
+# --- MAGPIE PRESET (mirrors ElementProperty.from_preset("magpie")) ---
+MAGPIE_FEATURES = [
+    "Number", "MendeleevNumber", "AtomicWeight", "MeltingT", "Column", "Row",
+    "CovalentRadius", "Electronegativity", "NsValence", "NpValence", "NdValence",
+    "NfValence", "NValence", "NsUnfilled", "NpUnfilled", "NdUnfilled", "NfUnfilled",
+    "NUnfilled", "GSvolume_pa", "GSbandgap", "GSmagmom", "SpaceGroupNumber",
+]
+MAGPIE_STATS = ["minimum", "maximum", "range", "mean", "avg_dev", "mode"]
+MAGPIE_COLUMNS = [f"MagpieData {stat} {feat}" for feat in MAGPIE_FEATURES for stat in MAGPIE_STATS]
+
+# Every element Magpie has data for (H..Lr)
+ELEMENTS = [
+    "H", "He", "Li", "Be", "B", "C", "N", "O", "F", "Ne", "Na", "Mg", "Al", "Si", "P", "S",
+    "Cl", "Ar", "K", "Ca", "Sc", "Ti", "V", "Cr", "Mn", "Fe", "Co", "Ni", "Cu", "Zn", "Ga",
+    "Ge", "As", "Se", "Br", "Kr", "Rb", "Sr", "Y", "Zr", "Nb", "Mo", "Tc", "Ru", "Rh", "Pd",
+    "Ag", "Cd", "In", "Sn", "Sb", "Te", "I", "Xe", "Cs", "Ba", "La", "Ce", "Pr", "Nd", "Pm",
+    "Sm", "Eu", "Gd", "Tb", "Dy", "Ho", "Er", "Tm", "Yb", "Lu", "Hf", "Ta", "W", "Re", "Os",
+    "Ir", "Pt", "Au", "Hg", "Tl", "Pb", "Bi", "Po", "At", "Rn", "Fr", "Ra", "Ac", "Th", "Pa",
+    "U", "Np", "Pu", "Am", "Cm", "Bk", "Cf", "Es", "Fm", "Md", "No", "Lr",
+]
+
+_TOKEN = re.compile(r"([A-Z][a-z]?)(\d*\.?\d*)")
+
+def build_table(path=TABLE_PATH):
+    """
+    Dumps the per-element Magpie properties from matminer into a compact
+    (n_elements, n_properties) array. Only needed once (or after a matminer upgrade).
+    """
+    from matminer.utils.data import MagpieData # type: ignore
+
+    data_source = MagpieData()
+    values = np.array(
+        [[data_source.get_elemental_property(_Element(el), feat) for feat in MAGPIE_FEATURES] for el in ELEMENTS],
+        dtype=np.float64,
+    )
+    np.savez(path, elements=np.array(ELEMENTS), features=np.array(MAGPIE_FEATURES), values=values)
+    return path
+
+class _Element:
+    """Minimal stand-in for pymatgen's Element (MagpieData only reads .symbol)."""
+    def __init__(self, symbol):
+        self.symbol = symbol
+
+def parse_formula(formula):
+    """
+    Heuristic parser for flat formulas ('BaHfS3', 'Li3PS4').
+    Returns (symbols, amounts) in order of first appearance, like pymatgen.
+    Raises ValueError for anything it cannot read (e.g. parentheses).
+    """
+    amounts = {}
+    consumed = 0
+    for match in _TOKEN.finditer(formula):
+        if match.start() != consumed:
+            break
+        symbol, amt = match.groups()
+        amounts[symbol] = amounts.get(symbol, 0.0) + (float(amt) if amt else 1.0)
+        consumed = match.end()
+    if consumed != len(formula) or not amounts:
+        raise ValueError(f"Cannot parse formula: {formula!r}")
+    return list(amounts), list(amounts.values())
+
+class MagpieFeaturizer:
+    """
+    NumPy re-implementation of ElementProperty.from_preset("magpie").
+    Loads the element table once, then featurizes a whole batch of formulas
+    with array statistics (no pymatgen, no pandas).
+    Unparseable formulas or unknown elements give a NaN row (ignore_errors=True).
+    """
+    def __init__(self, columns=None, path=TABLE_PATH):
+        if not os.path.exists(path):
+            build_table(path)
+        table = np.load(path)
+        self.index = {str(el): i for i, el in enumerate(table["elements"])}
+        self.values = table["values"]
+
+        # Map requested columns onto native (feature, stat) order; missing cols become 0
+        self.columns = list(MAGPIE_COLUMNS if columns is None else columns)
+        native = {col: i for i, col in enumerate(MAGPIE_COLUMNS)}
+        self.col_idx = np.array([native.get(col, -1) for col in self.columns])
+
+    def featurize(self, formulas):
+        """Returns an (n_formulas, n_columns) float array."""
+        n = len(formulas)
+        parsed = []
+        width = 1
+        for formula in formulas:
+            try:
+                symbols, amounts = parse_formula(formula)
+                idx = [self.index[s] for s in symbols]
+            except (ValueError, KeyError):
+                idx, amounts = [], []
+            parsed.append((idx, amounts))
+            width = max(width, len(idx))
+
+        # 1. Pad into (n, width) element / weight arrays
+        el_idx = np.zeros((n, width), dtype=np.int64)
+        weights = np.zeros((n, width))
+        mask = np.zeros((n, width), dtype=bool)
+        for row, (idx, amounts) in enumerate(parsed):
+            el_idx[row, :len(idx)] = idx
+            weights[row, :len(idx)] = amounts
+            mask[row, :len(idx)] = True
+        valid = mask.any(axis=1)
+
+        # 2. Gather element properties -> (n, width, n_features)
+        data = self.values[el_idx]
+        m = mask[:, :, None]
+        w = weights[:, :, None]
+        total = weights.sum(axis=1)[:, None]
+
+        # 3. Statistics (same definitions as matminer's PropertyStats)
+        minimum = np.where(m, data, np.inf).min(axis=1)
+        maximum = np.where(m, data, -np.inf).max(axis=1)
+        mean = np.where(m, data * w, 0.0).sum(axis=1) / total
+        avg_dev = np.where(m, np.abs(data - mean[:, None, :]) * w, 0.0).sum(axis=1) / total
+        is_mode = mask & np.isclose(weights, weights.max(axis=1, keepdims=True))
+        mode = np.where(is_mode[:, :, None], data, np.inf).min(axis=1)
+
+        stats = np.stack([minimum, maximum, maximum - minimum, mean, avg_dev, mode], axis=2)
+        native = stats.reshape(n, -1) # feature-major, stat-minor like MAGPIE_COLUMNS
+        native[~valid] = np.nan
+
+        out = np.zeros((n, len(self.columns)))
+        keep = self.col_idx >= 0
+        out[:, keep] = native[:, self.col_idx[keep]]
+        return out
+
+if __name__ == '__main__':
+    # Rebuild the table and check it against matminer on a few formulas
+    import pandas as pd # type: ignore
+    from matminer.featurizers.composition import ElementProperty # type: ignore
+    from matminer.featurizers.conversions import StrToComposition # type: ignore
+
+    print(f"Building Magpie table -> {build_table()}")
+    formulas = ["BaHfS3", "CaGeTe3", "CsPbI3", "Li3PS4", "EuTiS3"]
+    df = StrToComposition().featurize_dataframe(pd.DataFrame({"formula": formulas}), "formula")
+    ref = ElementProperty.from_preset(preset_name="magpie").featurize_dataframe(df, col_id="composition")
+    ref = ref[MAGPIE_COLUMNS].to_numpy(dtype=float)
+    ours = MagpieFeaturizer().featurize(formulas)
+    print(f"Max abs deviation vs matminer: {np.nanmax(np.abs(ours - ref)):.3e}")
@@ -0,0 +1,121 @@
+import warnings
+warnings.filterwarnings('ignore')
+
+import argparse # type: ignore
+import time # type: ignore
+import sys # type: ignore
+import os # type: ignore
+import numpy as np # type: ignore
+import pandas as pd # type: ignore
+from scipy.stats import loguniform, randint, uniform # type: ignore
+from sklearn.ensemble import HistGradientBoostingRegressor # type: ignore
+from sklearn.experimental import enable_halving_search_cv # type: ignore # noqa: F401
+from sklearn.model_selection import HalvingGridSearchCV, HalvingRandomSearchCV, KFold, cross_validate, train_test_split # type: ignore
+
+# Get script directory for relative paths
+script_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, script_dir)
+from judge import load_specialist_dataset, load_features # Shared dataset + cached feature matrix
+
+# --- SEARCH SPACES ---
+PARAM_GRID = {
+    'learning_rate': [0.02, 0.05, 0.1],
+    'max_iter': [250, 500, 1000],
+    'max_depth': [6, 10, 15],
+    'l2_regularization': [0.0, 0.1, 1.0],
+}
+PARAM_DISTRIBUTIONS = {
+    'learning_rate': loguniform(0.01, 0.3),
+    'max_iter': randint(100, 1500),
+    'max_depth': randint(3, 20),
+    'l2_regularization': uniform(0.0, 2.0),
+}
+
+def run_sweep(X, y, search="grid", n_candidates=50, folds=5, factor=3, min_samples=100, top_k=5,
+              n_jobs=-1, random_state=42):
+    """
+    K-fold CV sweep of the judge's HistGradientBoosting hyperparameters.
+    Successive halving fits every config on a small sample first and only
+    promotes the best 1/factor to the next (larger) round, so poor configs
+    stop early. `min_samples` is the first round's training size (HGB needs
+    enough rows for min_samples_leaf=20 to split).
+    Halving rounds stop at min_samples * factor^k rows, so a final round
+    re-scores the `top_k` best configs with the same folds on all of X.
+    Returns a results table, full-data round first, sorted by CV MAE.
+    """
+    base = HistGradientBoostingRegressor(random_state=random_state)
+    cv = KFold(n_splits=folds, shuffle=True, random_state=random_state)
+    common = dict(cv=cv, factor=factor, min_resources=min_samples, aggressive_elimination=True,
+                  scoring='neg_mean_absolute_error', n_jobs=n_jobs, random_state=random_state, refit=False)
+
+    if search == "grid":
+        searcher = HalvingGridSearchCV(base, PARAM_GRID, **common)
+    else:
+        searcher = HalvingRandomSearchCV(base, PARAM_DISTRIBUTIONS, n_candidates=n_candidates, **common)
+    searcher.fit(X, y)
+
+    res = pd.DataFrame(searcher.cv_results_)
+    table = pd.DataFrame({
+        'round': res['iter'],
+        'n_samples': res['n_resources'],
+        'learning_rate': res['param_learning_rate'].astype(float),
+        'max_iter': res['param_max_iter'].astype(int),
+        'max_depth': res['param_max_depth'].astype(int),
+        'l2_regularization': res['param_l2_regularization'].astype(float),
+        'cv_mae': -res['mean_test_score'],
+        'cv_mae_std': res['std_test_score'],
+        'fit_time_s': res['mean_fit_time'],
+        # Scoring a fold = predict on its held-out rows (+ a negligible MAE)
+        'predict_time_s': res['mean_score_time'],
+    })
+    # Latency per predicted row, for picking models on speed as well as MAE
+    n_test = (res['n_resources'] / folds).clip(lower=1)
+    table['predict_us_per_row'] = table['predict_time_s'] / n_test * 1e6
+
+    # --- FINAL ROUND: the top_k configs on every row ---
+    params = ['learning_rate', 'max_iter', 'max_depth', 'l2_regularization']
+    finalists = table.sort_values(['round', 'cv_mae'], ascending=[False, True]).drop_duplicates(subset=params).head(top_k)
+    final = []
+    for _, row in finalists.iterrows():
+        config = {'learning_rate': row['learning_rate'], 'max_iter': int(row['max_iter']),
+                  'max_depth': int(row['max_depth']), 'l2_regularization': row['l2_regularization']}
+        scores = cross_validate(base.set_params(**config), X, y, cv=cv, scoring='neg_mean_absolute_error', n_jobs=n_jobs)
+        final.append({'round': table['round'].max() + 1, 'n_samples': len(X), **config,
+                      'cv_mae': -scores['test_score'].mean(), 'cv_mae_std': scores['test_score'].std(),
+                      'fit_time_s': scores['fit_time'].mean(), 'predict_time_s': scores['score_time'].mean(),
+                      'predict_us_per_row': scores['score_time'].mean() / (len(X) / folds) * 1e6})
+    table = pd.concat([table, pd.DataFrame(final)], ignore_index=True)
+
+    # Keep each config's furthest round only (the survivors' numbers are on the most data)
+    table = table.sort_values('round').drop_duplicates(
+        subset=params, keep='last')
+    return table.sort_values(['round', 'cv_mae'], ascending=[False, True]).reset_index(drop=True)
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Hyperparameter sweep for the stability judge")
+    parser.add_argument("--search", choices=["grid", "random"], default="grid")
+    parser.add_argument("--n-candidates", type=int, default=50, help="Configs sampled in random search")
+    parser.add_argument("--folds", type=int, default=5)
+    parser.add_argument("--factor", type=int, default=3, help="Successive-halving elimination factor")
+    parser.add_argument("--min-samples", type=int, default=100, help="Training rows in the first halving round")
+    parser.add_argument("--top-k", type=int, default=5, help="Best configs re-scored on the full training split")
+    parser.add_argument("--jobs", type=int, default=-1, help="Parallel CV fits (-1 = all cores)")
+    parser.add_argument("--out", default=os.path.join(script_dir, "sweep_results.csv"))
+    args = parser.parse_args()
+
+    # Same data and held-out split as judge.py; the sweep only sees the training part
+    df_clean = load_specialist_dataset()
+    X = load_features(df_clean)
+    X_train, _, y_train, _ = train_test_split(X, df_clean['e_hull'], test_size=0.1, random_state=42)
+
+    print(f"Sweeping ({args.search}, {args.folds}-fold CV, halving factor {args.factor})...")
+    t0 = time.time()
+    table = run_sweep(np.asarray(X_train), np.asarray(y_train), search=args.search,
+                      n_candidates=args.n_candidates, folds=args.folds, factor=args.factor,
+                      min_samples=args.min_samples, top_k=args.top_k, n_jobs=args.jobs)
+    print(f"Sweep finished in {time.time() - t0:.1f}s ({len(table)} configs)")
+
+    table.to_csv(args.out, index=False)
+    print("\n--- TOP CONFIGS ---")
+    print(table.head(10).to_string(index=False))
+    print(f"\nResults saved to '{args.out}'")
@@ -1,17 +1,32 @@
+import os
+import sys
 import gymnasium as gym # type: ignore
 from gymnasium import spaces # type: ignore
 import numpy as np # type: ignore
 
-class PerovskiteFurnaceEnv(gym.Env):
+# Repo root holds the shared A->B->C kinetics
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+from kinetics import INTEGRATORS, ArrheniusRateTable, exact_chain # type: ignore
+
+class PerovskiteFurnaceEnv(ArrheniusRateTable, gym.Env):
     """
     Virtual Furnace v8.0 (Calibrated Physics)
     Changes:
     1. Reduced A_deg (Degradation Rate) by 10x. 
        This makes the material more stable, matching real-world BaZrS3.
     2. Max Time = 300 (5 Hours) to allow for a perfect soak.
+
+    integrator="exact" replaces the explicit Euler update with the analytic
+    A->B->C solution; control_interval sets the minutes per action (the
+    episode stays 5 hours, so 5 -> 60 decisions) and scales the +/-10 K
+    step so the ramp rate per minute is unchanged.
     """
-    def __init__(self):
+    RATE_CONSTANTS = (('A_form', 'Ea_form_R'), ('A_deg', 'Ea_deg_R')) # Order returned by _rates(T)
+
+    def __init__(self, integrator="euler", control_interval=1):
         super(PerovskiteFurnaceEnv, self).__init__()
+        if integrator not in INTEGRATORS:
+            raise ValueError(f"integrator must be one of {INTEGRATORS}, got {integrator!r}")
         self.action_space = spaces.Discrete(3)
         self.observation_space = spaces.Box(
             low=np.array([0, 0, 0, 0]), 
@@ -28,14 +43,18 @@ class PerovskiteFurnaceEnv(gym.Env):
         # This makes the material 8x more stable, opening the synthesis window.
         self.A_deg = 5.0e9        
         
-        self.dt = 1.0  
-        self.max_time = 300
+        self.integrator = integrator
+        self.dt = float(control_interval)
+        self.max_time = int(round(300 / self.dt)) # decisions per 5-hour run
+        self.temp_step = 10.0 * self.dt
+        self.temp_min, self.temp_max = 300.0, 1600.0
+        self.build_rate_table()
 
     def reset(self, seed=None, options=None):
         super().reset(seed=seed)
         
-        # TRAINING: Random Start (300-700K)
-        self.temp = float(np.random.uniform(300, 700))
+        # TRAINING: Random Start (300-700K), reproducible via reset(seed=...)
+        self.temp = float(self.np_random.uniform(300, 700))
         
         # TESTING: Deterministic Start
         if options and 'temp' in options:
@@ -43,25 +62,28 @@ class PerovskiteFurnaceEnv(gym.Env):
             
         self.state = np.array([1.0, 0.0, 0.0]) 
         self.time_step = 0
+        self._reset_rates()
         return self._get_obs(), {}
 
     def step(self, action):
-        if action == 0: self.temp -= 10
-        elif action == 2: self.temp += 10
-        self.temp = np.clip(self.temp, 300, 1600)
+        if action == 0: self.temp -= self.temp_step
+        elif action == 2: self.temp += self.temp_step
+        self.temp = np.clip(self.temp, self.temp_min, self.temp_max)
         
         T = self.temp
-        k_form = self.A_form * np.exp(-self.Ea_form_R / T)
-        k_deg = self.A_deg * np.exp(-self.Ea_deg_R / T)
+        k_form, k_deg = self._rates(T)
         
-        precursor, target, impurity = self.state
-        moles_forming = k_form * precursor * self.dt
-        moles_burning = k_deg * target * self.dt
-        
-        self.state[0] -= moles_forming
-        self.state[1] += (moles_forming - moles_burning)
-        self.state[2] += moles_burning
-        self.state = np.clip(self.state, 0, 1)
+        if self.integrator == "exact":
+            self.state, moles_forming, moles_burning = exact_chain(self.state, k_form, k_deg, self.dt)
+        else:
+            precursor, target, impurity = self.state
+            moles_forming = k_form * precursor * self.dt
+            moles_burning = k_deg * target * self.dt
+            
+            self.state[0] -= moles_forming
+            self.state[1] += (moles_forming - moles_burning)
+            self.state[2] += moles_burning
+            self.state = np.clip(self.state, 0, 1)
         
         self.time_step += 1
         done = self.time_step >= self.max_time
@@ -71,9 +93,9 @@ class PerovskiteFurnaceEnv(gym.Env):
         # Boosted reward to encourage finding the new stable window
         reward = delta_yield * 2000.0 
         
-        # Penalty only kicks in if impurity gets dangerous (>5%)
+        # Penalty only kicks in if impurity gets dangerous (>5%), per minute held there
         if self.state[2] > 0.05:
-             reward -= (self.state[2] * 50.0)
+             reward -= (self.state[2] * 50.0) * self.dt
         
         if done:
             reward += self.state[1] * 50.0
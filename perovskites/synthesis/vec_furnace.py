@@ -0,0 +1,65 @@
+import os
+import sys
+import numpy as np # type: ignore
+# Repo root holds the shared batched-VecEnv plumbing
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+from vec_base import BatchedFurnaceVecEnv # type: ignore
+from kinetics import exact_chain # type: ignore
+from furnace import PerovskiteFurnaceEnv # Scalar reference physics
+
+class PerovskiteFurnaceVecEnv(BatchedFurnaceVecEnv):
+    """
+    N independent Virtual Furnaces stepped together.
+    State lives in (N,) / (N, 3) arrays and every step is one NumPy pass,
+    with the exact float64 operations of PerovskiteFurnaceEnv.step. So lane i
+    is bit-for-bit identical to a scalar env reset with seed + i
+    (the DummyVecEnv seeding convention).
+    Drop-in SB3 VecEnv (see vec_base.BatchedVecEnv).
+    `integrator` / `control_interval` as in PerovskiteFurnaceEnv.
+    """
+    def __init__(self, num_envs, integrator="euler", control_interval=1):
+        ref = PerovskiteFurnaceEnv(integrator=integrator, control_interval=control_interval)
+
+        # --- PHYSICS (copied from the scalar env, single source of truth) ---
+        self.Ea_form_R = ref.Ea_form_R
+        self.A_form = ref.A_form
+        self.Ea_deg_R = ref.Ea_deg_R
+        self.A_deg = ref.A_deg
+        super().__init__(num_envs, ref)
+
+    def _reset_lanes(self, lanes):
+        for i in lanes:
+            self.temp[i] = self._start_temp(i, float(self._lane_rng(i).uniform(300, 700)))
+        self.state[lanes] = [1.0, 0.0, 0.0]
+        self.time_step[lanes] = 0
+
+    def _advance(self):
+        """Kinetics + reward for one control interval at the current temperatures."""
+        # 2. Arrhenius Kinetics
+        T = self.temp
+        k_form = self.A_form * np.exp(-self.Ea_form_R / T)
+        k_deg = self.A_deg * np.exp(-self.Ea_deg_R / T)
+
+        if self.integrator == "exact":
+            self.state, moles_forming, moles_burning = exact_chain(self.state, k_form, k_deg, self.dt)
+        else:
+            precursor, target = self.state[:, 0].copy(), self.state[:, 1].copy()
+            moles_forming = k_form * precursor * self.dt
+            moles_burning = k_deg * target * self.dt
+
+            self.state[:, 0] -= moles_forming
+            self.state[:, 1] += (moles_forming - moles_burning)
+            self.state[:, 2] += moles_burning
+            self.state = np.clip(self.state, 0, 1)
+
+        self.time_step += 1
+        dones = self.time_step >= self.max_time
+
+        # --- REWARD (same rules as the scalar env) ---
+        reward = (moles_forming - moles_burning) * 2000.0
+        impurity = self.state[:, 2]
+        reward = np.where(impurity > 0.05, reward - (impurity * 50.0) * self.dt, reward)
+        reward = np.where(dones, reward + self.state[:, 1] * 50.0, reward)
+        return reward, dones
+
+evaluate_recipes = PerovskiteFurnaceVecEnv.evaluate_recipes
@@ -0,0 +1,151 @@
+import os
+import time
+import argparse
+import importlib
+import numpy as np # type: ignore
+
+# trainer (SB3 + torch) is imported only where a PPO run or the env registry is
+# needed, so the NumPy-only search helpers stay cheap to import
+
+# Get repo root for relative paths
+repo_root = os.path.dirname(os.path.abspath(__file__))
+
+# Ramp-soak-quench parameters, searched in a [0, 1] box and mapped onto these ranges
+PARAMS = ['soak_temp', 'ramp_rate', 'soak_minutes', 'quench_rate']
+
+def param_bounds(env):
+    """(low, high) for each of PARAMS; ramp/quench rates are capped by the furnace's own K/min."""
+    max_rate = env.temp_step / env.dt
+    horizon = env.max_time * env.dt
+    low = np.array([env.temp_min, 0.05 * max_rate, 0.0, 0.05 * max_rate])
+    high = np.array([env.temp_max, max_rate, horizon, max_rate])
+    return low, high
+
+def ramp_soak_quench(params, start_temp, env):
+    """
+    Piecewise-linear temperature profiles, one per row of `params` (N, 4):
+    ramp from start_temp to soak_temp at ramp_rate K/min, hold for
+    soak_minutes, then cool at quench_rate K/min down to temp_min.
+    Returns (N, max_time) temperatures held during each control interval.
+    """
+    soak_temp, ramp, soak, quench = (params[:, i:i + 1] for i in range(4))
+    t = (np.arange(env.max_time) + 1) * env.dt # end of each interval, like a +/- step then hold
+    t_ramp = np.abs(soak_temp - start_temp) / ramp
+    rising = start_temp + np.sign(soak_temp - start_temp) * np.minimum(t, t_ramp) * ramp
+    cooling = soak_temp - np.maximum(t - t_ramp - soak, 0.0) * quench
+    temps = np.where(t <= t_ramp + soak, rising, cooling)
+    return np.clip(temps, env.temp_min, env.temp_max)
+
+def cross_entropy_search(score, dim, population=512, elite_frac=0.1, generations=40, smoothing=0.7, seed=0, verbose=True):
+    """
+    Cross-entropy method in the unit box: sample a Gaussian population, keep
+    the top elite_frac, refit mean/std (smoothed), repeat.
+    `score(u)` takes the whole (population, dim) generation and returns (population,)
+    scores to maximize, so each generation is one vectorized batch.
+    Returns (best_u, best_score, history of per-generation best scores).
+    """
+    rng = np.random.default_rng(seed)
+    mean, std = np.full(dim, 0.5), np.full(dim, 0.3)
+    n_elite = max(2, int(population * elite_frac))
+    best_u, best_score, history = None, -np.inf, []
+    for gen in range(generations):
+        u = np.clip(rng.normal(mean, std, size=(population, dim)), 0.0, 1.0)
+        scores = score(u)
+        elite = u[np.argsort(scores)[-n_elite:]]
+        mean = smoothing * elite.mean(axis=0) + (1 - smoothing) * mean
+        std = np.maximum(smoothing * elite.std(axis=0) + (1 - smoothing) * std, 1e-3)
+        if scores.max() > best_score:
+            best_score, best_u = float(scores.max()), u[np.argmax(scores)].copy()
+        history.append(float(scores.max()))
+        if verbose and (gen % 10 == 0 or gen == generations - 1):
+            print(f"    gen {gen:3d} | best {best_score:.4f} | mean {scores.mean():.4f}")
+    return best_u, best_score, history
+
+def ppo_baseline(env_name, run_dir, start_temp, env_kwargs, episodes=20):
+    """
+    Mean final yield of the saved PPO policy from the same start, plus its run info (or None).
+    The policy is scored on the furnace it was trained on; raises ValueError when
+    that is not the furnace described by `env_kwargs` (the yields would not compare).
+    """
+    import trainer # type: ignore
+
+    info = trainer.load_run_info(env_name, run_dir)
+    if info is None:
+        return None, None
+    trained = info.get('env_kwargs', {})
+    if not trainer.same_env_kwargs(env_name, trained, env_kwargs):
+        raise ValueError(f"PPO run was trained with {trained or 'the default furnace'}, not {env_kwargs}; "
+                         f"re-run with matching --integrator/--control-interval")
+    policy = trainer.load_policy(env_name, run_dir)
+    env = trainer.load_class(env_name)(**trained)
+    yields = []
+    for seed in range(episodes):
+        obs, _ = env.reset(seed=seed, options={'temp': start_temp})
+        done = False
+        while not done:
+            action, _ = policy.predict(obs)
+            obs, _, done, _, _ = env.step(action)
+        yields.append(env.state[1])
+    return float(np.mean(yields)), info
+
+if __name__ == '__main__':
+    import trainer # Environment registry (+ the saved PPO run to compare against)
+
+    parser = argparse.ArgumentParser(description="Cross-entropy search over ramp-soak-quench furnace recipes")
+    parser.add_argument("--env", choices=["perovskite", "alloy"], required=True)
+    parser.add_argument("--objective", choices=["yield", "reward"], default="yield")
+    parser.add_argument("--start-temp", type=float, default=300.0, help="Furnace temperature at t=0 (K)")
+    parser.add_argument("--population", type=int, default=512)
+    parser.add_argument("--generations", type=int, default=40)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--integrator", choices=["euler", "exact"], default="euler")
+    parser.add_argument("--control-interval", type=int, default=1, help="Minutes per control interval")
+    parser.add_argument("--run-dir", default=None, help="Checkpoint dir of a PPO run to compare against "
+                                                        "(default: the env's optimize.py checkpoints)")
+    args = parser.parse_args()
+
+    env_kwargs = {'integrator': args.integrator, 'control_interval': args.control_interval}
+    env = trainer.load_class(args.env)(**env_kwargs)
+    vec_module = importlib.import_module(trainer.load_class(args.env, batched=True).__module__)
+    low, high = param_bounds(env)
+
+    def score(u):
+        temps = ramp_soak_quench(low + u * (high - low), args.start_temp, env)
+        out = vec_module.evaluate_recipes(temps, temperatures=True, start_temp=args.start_temp, **env_kwargs)
+        return out[args.objective]
+
+    print(f"🔎 SEARCH STARTED: {args.generations} generations x {args.population} recipes...")
+    t0 = time.time()
+    best_u, _, _ = cross_entropy_search(score, len(PARAMS), population=args.population,
+                                        generations=args.generations, seed=args.seed)
+    elapsed = time.time() - t0
+    print("✅ SEARCH COMPLETE.")
+
+    # Re-run the winner once for its full numbers
+    best = low + best_u * (high - low)
+    temps = ramp_soak_quench(best[None, :], args.start_temp, env)
+    result = vec_module.evaluate_recipes(temps, temperatures=True, start_temp=args.start_temp, **env_kwargs)
+    soak_temp, ramp, soak, quench = best
+    print(f"\n🔥 Recipe: ramp {args.start_temp:.0f} K -> {soak_temp:.0f} K at {ramp:.2f} K/min, "
+          f"soak {soak:.0f} min, quench at {quench:.2f} K/min")
+    print(f"Final Yield Achieved: {result['yield'][0]*100:.2f}%  (impurity {result['impurity'][0]*100:.2f}%, "
+          f"reward {result['reward'][0]:.1f})")
+
+    # --- COMPARISON WITH PPO ---
+    n_evals = args.generations * args.population
+    run_dir = args.run_dir or os.path.join(repo_root, trainer.ENVS[args.env][0], "checkpoints")
+    try:
+        ppo_yield, info = ppo_baseline(args.env, run_dir, args.start_temp, env_kwargs)
+        mismatch = None
+    except ValueError as exc:
+        ppo_yield, info, mismatch = None, None, exc
+    print(f"\n{'method':<6} {'final yield':>12} {'wall clock':>11} {'budget':>24}")
+    print(f"{'CEM':<6} {result['yield'][0]*100:>11.2f}% {elapsed:>10.1f}s {n_evals:>14,} recipes")
+    if mismatch is not None:
+        print(f"{'PPO':<6} {'n/a':>12} {'n/a':>11}   ({mismatch})")
+    elif info is None:
+        print(f"{'PPO':<6} {'n/a':>12} {'n/a':>11}   (no trained model in '{run_dir}'; run optimize.py first)")
+    else:
+        resumed = ", resumed run" if info['resumed'] else ""
+        print(f"{'PPO':<6} {ppo_yield*100:>11.2f}% {info['train_seconds']:>10.1f}s "
+              f"{info['timesteps']:>14,} env steps{resumed}")
@@ -0,0 +1,323 @@
+import sys
+import os
+import time
+import argparse
+import glob
+import json
+import importlib
+import importlib.util
+import inspect
+import multiprocessing
+from functools import partial
+
+from stable_baselines3 import PPO # type: ignore
+from stable_baselines3.common.callbacks import BaseCallback, CheckpointCallback # type: ignore
+from stable_baselines3.common.vec_env import DummyVecEnv, SubprocVecEnv, VecMonitor, VecNormalize # type: ignore
+
+# Get repo root for relative paths
+repo_root = os.path.dirname(os.path.abspath(__file__))
+
+# --- ENVIRONMENT REGISTRY ---
+# Each entry: (module directory, scalar env, batched VecEnv or None)
+ENVS = {
+    'perovskite': ("perovskites/synthesis", "furnace.PerovskiteFurnaceEnv", "vec_furnace.PerovskiteFurnaceVecEnv"),
+    'alloy': ("alloys", "furnace.AlloyFurnaceEnv", "vec_furnace.AlloyFurnaceVecEnv"),
+    'battery': ("alloys/integration", "battery.BatteryInterfaceEnv", "vec_battery.BatteryInterfaceVecEnv"),
+}
+VEC_TYPES = ["dummy", "subproc", "batched"]
+
+def _load_module(env_name, module):
+    """
+    Imports one of an env's modules by file path as `<env>_<module>`: the
+    furnaces share module names (furnace, vec_furnace), so a bare import
+    would hand every env after the first one the wrong module.
+    The batched module imports its scalar reference by bare name; while it
+    runs, that name points at this env's own scalar module.
+    """
+    name = f"{env_name}_{module}"
+    if name not in sys.modules:
+        directory, scalar, _ = ENVS[env_name]
+        scalar_module = scalar.split(".")[0]
+        alias = {scalar_module: _load_module(env_name, scalar_module)} if module != scalar_module else {}
+        spec = importlib.util.spec_from_file_location(name, os.path.join(repo_root, directory, f"{module}.py"))
+        loaded = importlib.util.module_from_spec(spec)
+        saved = {bare: sys.modules.get(bare) for bare in alias}
+        sys.modules[name] = loaded
+        sys.modules.update(alias)
+        try:
+            spec.loader.exec_module(loaded)
+        except BaseException:
+            del sys.modules[name]
+            raise
+        finally:
+            for bare, previous in saved.items():
+                if previous is None:
+                    del sys.modules[bare]
+                else:
+                    sys.modules[bare] = previous
+    return sys.modules[name]
+
+def load_class(env_name, batched=False):
+    """Import an env class (each env's modules load under their own names, see _load_module)."""
+    _, scalar, vec = ENVS[env_name]
+    target = vec if batched else scalar
+    if target is None:
+        raise ValueError(f"No batched VecEnv for '{env_name}' yet; use --vec dummy or subproc")
+    module, cls = target.split(".")
+    return getattr(_load_module(env_name, module), cls)
+
+def _make_env(env_name, env_kwargs=None):
+    """Top-level env factory, so SubprocVecEnv workers can unpickle it."""
+    return load_class(env_name)(**(env_kwargs or {}))
+
+def make_vec_env(env_name, n_envs=1, vec="dummy", env_kwargs=None, **vec_kwargs):
+    """
+    - dummy:   N scalar envs stepped in this process (DummyVecEnv).
+    - subproc: N scalar envs, one worker process each (SubprocVecEnv).
+    - batched: one natively vectorized env holding all N lanes as arrays.
+    `env_kwargs` go to every env (e.g. integrator); `vec_kwargs` only to the
+    batched env (e.g. per-lane kinetics).
+    Wrapped in VecMonitor so PPO still logs episode rewards/lengths.
+    """
+    if vec == "batched":
+        return VecMonitor(load_class(env_name, batched=True)(n_envs, **(env_kwargs or {}), **vec_kwargs))
+    if vec_kwargs:
+        raise ValueError(f"{sorted(vec_kwargs)} need --vec batched")
+    env_fns = [partial(_make_env, env_name, env_kwargs) for _ in range(n_envs)]
+    if vec == "subproc":
+        # fork where available: the optimize scripts run at module level, and
+        # spawn/forkserver workers would re-import (and re-run) them
+        start = "fork" if "fork" in multiprocessing.get_all_start_methods() else None
+        return VecMonitor(SubprocVecEnv(env_fns, start_method=start))
+    return VecMonitor(DummyVecEnv(env_fns))
+
+def ppo_defaults(n_envs):
+    """
+    PPO rollout sizes tuned to the worker count.
+    n_steps shrinks as workers grow so each update still sees ~2048 samples
+    (never below 64 steps per env); batch_size grows with it but keeps at
+    least 4 minibatches. n_envs=1 gives SB3's own defaults (2048 / 64).
+    """
+    n_steps = max(64, (2048 // n_envs) // 8 * 8)
+    rollout = n_steps * n_envs
+    batch_size = min(64 * n_envs, rollout // 4)
+    return {'n_steps': n_steps, 'batch_size': batch_size}
+
+class ThroughputCallback(BaseCallback):
+    """Measures env-steps/sec over the whole learn() call."""
+    def _on_training_start(self):
+        self.t0 = time.time()
+        self.start_steps = self.num_timesteps
+
+    def _on_step(self):
+        return True
+
+    def _on_training_end(self):
+        self.elapsed = time.time() - self.t0
+        self.steps_per_sec = (self.num_timesteps - self.start_steps) / max(self.elapsed, 1e-9)
+
+# --- CHECKPOINTS ---
+# Inside run_dir: ppo_<env>_<N>_steps.zip (+ ppo_<env>_vecnormalize_<N>_steps.pkl)
+# from CheckpointCallback, and ppo_<env>_final.zip (+ ..._vecnormalize_final.pkl,
+# ppo_<env>_final.json with the run's size and wall-clock time).
+# ppo_<env>_config.json records the env the run was started on (env_kwargs,
+# settings), so a resume from a periodic checkpoint can check it too.
+def _final_paths(env_name, run_dir):
+    prefix = os.path.join(run_dir, f"ppo_{env_name}")
+    return f"{prefix}_final.zip", f"{prefix}_vecnormalize_final.pkl"
+
+def load_run_info(env_name, run_dir):
+    """Timesteps / training seconds recorded with the final model, or None."""
+    path = os.path.join(run_dir, f"ppo_{env_name}_final.json")
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+def trained_env_kwargs(env_name, run_dir):
+    """env_kwargs the final model was trained with ({} for runs that predate recording them)."""
+    return (load_run_info(env_name, run_dir) or {}).get('env_kwargs', {})
+
+def same_env_kwargs(env_name, a, b):
+    """Whether two env_kwargs build the same env (missing keys take the env's defaults)."""
+    params = inspect.signature(load_class(env_name)).parameters.values()
+    defaults = {p.name: p.default for p in params if p.default is not p.empty}
+    return {**defaults, **a} == {**defaults, **b}
+
+def _check_resume(env_name, run_dir, model_path, env_kwargs, settings):
+    """Refuses to resume a checkpoint on a different env than it was trained on."""
+    if model_path == _final_paths(env_name, run_dir)[0]:
+        recorded = load_run_info(env_name, run_dir)
+    else:
+        path = os.path.join(run_dir, f"ppo_{env_name}_config.json")
+        recorded = None
+        if os.path.exists(path):
+            with open(path) as f:
+                recorded = json.load(f)
+    if recorded is None:
+        return # Nothing recorded (older run): trust the caller
+    trained, trained_settings = recorded.get('env_kwargs', {}), recorded.get('settings', {})
+    if not same_env_kwargs(env_name, trained, env_kwargs) or trained_settings != settings:
+        raise ValueError(f"'{model_path}' was trained with env_kwargs={trained}, settings={trained_settings}, "
+                         f"not env_kwargs={env_kwargs}, settings={settings}; resume with matching flags "
+                         f"or start a new run")
+
+def latest_checkpoint(env_name, run_dir):
+    """
+    Newest saved model in run_dir (periodic or final) and its VecNormalize
+    stats path, or (None, None) when nothing has been saved yet.
+    """
+    final_model, final_stats = _final_paths(env_name, run_dir)
+    candidates = glob.glob(os.path.join(run_dir, f"ppo_{env_name}_*_steps.zip"))
+    if os.path.exists(final_model):
+        candidates.append(final_model)
+    if not candidates:
+        return None, None
+    path = max(candidates, key=os.path.getmtime)
+    if path == final_model:
+        return path, final_stats
+    steps = path[:-len("_steps.zip")].rsplit("_", 1)[1]
+    return path, os.path.join(run_dir, f"ppo_{env_name}_vecnormalize_{steps}_steps.pkl")
+
+class TrainedPolicy:
+    """
+    A PPO model plus (optionally) the frozen VecNormalize statistics it was
+    trained with. predict() takes raw observations from a scalar env, like
+    model.predict(), so the final exam does not care whether stats exist.
+    """
+    def __init__(self, model, vec_normalize=None):
+        self.model = model
+        self.vec_normalize = vec_normalize
+        if vec_normalize is not None:
+            vec_normalize.training = False
+
+    def predict(self, obs, deterministic=False):
+        if self.vec_normalize is not None:
+            obs = self.vec_normalize.normalize_obs(obs)
+        return self.model.predict(obs, deterministic=deterministic)
+
+    def action_probs(self, obs):
+        """(N, n_actions) action probabilities for a batch of raw observations (discrete envs)."""
+        import torch # type: ignore
+        if self.vec_normalize is not None:
+            obs = self.vec_normalize.normalize_obs(obs)
+        with torch.no_grad():
+            dist = self.model.policy.get_distribution(torch.as_tensor(obs, device=self.model.device))
+        return dist.distribution.probs.cpu().numpy()
+
+def load_policy(env_name, run_dir, path=None):
+    """Loads the final model (or `path`) for evaluation, without retraining."""
+    model_path, stats_path = (path, None) if path else _final_paths(env_name, run_dir)
+    if not os.path.exists(model_path):
+        raise FileNotFoundError(f"No trained model at '{model_path}'; train without --eval-only first")
+    model = PPO.load(model_path)
+    vec_normalize = None
+    if stats_path and os.path.exists(stats_path):
+        vec_normalize = VecNormalize.load(stats_path, DummyVecEnv([partial(_make_env, env_name)]))
+    return TrainedPolicy(model, vec_normalize)
+
+def add_training_args(parser, timesteps, vec="dummy"):
+    parser.add_argument("--n-envs", type=int, default=1, help="Parallel environments")
+    parser.add_argument("--vec", choices=VEC_TYPES, default=vec, help="How the environments are vectorized")
+    parser.add_argument("--timesteps", type=int, default=timesteps, help="Total PPO timesteps (a resumed run trains up to this)")
+    parser.add_argument("--normalize", action="store_true", help="Wrap training envs in VecNormalize")
+    parser.add_argument("--checkpoint-every", type=int, default=25000, help="Env steps between checkpoints (0 = off)")
+    parser.add_argument("--resume", action="store_true", help="Continue from the newest checkpoint")
+    parser.add_argument("--eval-only", action="store_true", help="Skip training and load the saved final model")
+    return parser
+
+def train_ppo(env_name, n_envs=1, vec="dummy", total_timesteps=150000, verbose=1,
+              run_dir=None, checkpoint_every=0, resume=False, normalize=False, env_kwargs=None, settings=None,
+              **vec_kwargs):
+    """
+    Builds the VecEnv, trains PPO with worker-tuned defaults and reports throughput.
+    With `run_dir`, saves a checkpoint (policy + optimizer state, VecNormalize
+    stats) every `checkpoint_every` env steps and the final model at the end;
+    `resume` picks up the newest checkpoint and trains up to `total_timesteps`;
+    it keeps the checkpoint's normalization, and refuses `normalize` for a run
+    that was trained on raw observations.
+    `settings` is a JSON-able record of anything else that shapes the training
+    envs (e.g. {'kinetics_spread': 0.1} behind a param_sampler); it is saved
+    with `env_kwargs`, and resuming with either changed raises ValueError.
+    Returns a TrainedPolicy.
+    """
+    env_kwargs, settings = env_kwargs or {}, settings or {}
+    model_path, stats_path = latest_checkpoint(env_name, run_dir) if (resume and run_dir) else (None, None)
+    if model_path:
+        _check_resume(env_name, run_dir, model_path, env_kwargs, settings)
+    if model_path and normalize and not os.path.exists(stats_path):
+        # Fresh stats would feed normalized observations to a policy trained on raw ones
+        raise ValueError(f"'{model_path}' was trained without VecNormalize; resume it without --normalize "
+                         f"or start a new run")
+    env = make_vec_env(env_name, n_envs=n_envs, vec=vec, env_kwargs=env_kwargs, **vec_kwargs)
+
+    if model_path:
+        if os.path.exists(stats_path):
+            env = VecNormalize.load(stats_path, env) # A normalized run stays normalized, --normalize or not
+        model = PPO.load(model_path, env=env, verbose=verbose)
+        print(f"↩️  Resuming from '{model_path}' ({model.num_timesteps} steps done)")
+    else:
+        if resume:
+            print("No checkpoint found; training from scratch")
+        if normalize:
+            env = VecNormalize(env)
+        model = PPO("MlpPolicy", env, verbose=verbose, **ppo_defaults(n_envs))
+
+    if run_dir and not model_path:
+        os.makedirs(run_dir, exist_ok=True)
+        with open(os.path.join(run_dir, f"ppo_{env_name}_config.json"), "w") as f:
+            json.dump({'env_kwargs': env_kwargs, 'settings': settings}, f)
+
+    meter = ThroughputCallback()
+    callbacks = [meter]
+    if run_dir and checkpoint_every > 0:
+        os.makedirs(run_dir, exist_ok=True)
+        callbacks.append(CheckpointCallback(save_freq=max(checkpoint_every // n_envs, 1), save_path=run_dir,
+                                            name_prefix=f"ppo_{env_name}", save_vecnormalize=True))
+    remaining = max(total_timesteps - model.num_timesteps, 0)
+    model.learn(total_timesteps=remaining, callback=callbacks, reset_num_timesteps=not model_path)
+    print(f"⚡ Throughput: {meter.steps_per_sec:,.0f} env-steps/sec "
+          f"({n_envs} envs, {vec}, {meter.elapsed:.1f}s)")
+
+    vec_normalize = env if isinstance(env, VecNormalize) else None
+    if run_dir:
+        os.makedirs(run_dir, exist_ok=True)
+        final_model, final_stats = _final_paths(env_name, run_dir)
+        model.save(final_model)
+        if vec_normalize is not None:
+            vec_normalize.save(final_stats)
+        elif os.path.exists(final_stats):
+            os.remove(final_stats) # stale stats from an earlier normalized run
+        with open(os.path.join(run_dir, f"ppo_{env_name}_final.json"), "w") as f:
+            json.dump({'timesteps': int(model.num_timesteps), 'train_seconds': meter.elapsed,
+                       'resumed': bool(model_path), 'n_envs': n_envs, 'vec': vec, 'env_kwargs': env_kwargs,
+                       'settings': settings}, f)
+        print(f"💾 Model saved to '{final_model}'")
+    env.close()
+    return TrainedPolicy(model, vec_normalize)
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Multi-core PPO training for the AURELIUS environments")
+    parser.add_argument("--env", choices=sorted(ENVS), required=True)
+    parser.add_argument("--run-dir", default=os.path.join(repo_root, "checkpoints"), help="Checkpoint directory")
+    add_training_args(parser, timesteps=150000)
+    args = parser.parse_args()
+    env_kwargs = {}
+    if args.eval_only:
+        policy = load_policy(args.env, args.run_dir)
+        env_kwargs = trained_env_kwargs(args.env, args.run_dir)
+    else:
+        policy = train_ppo(args.env, n_envs=args.n_envs, vec=args.vec, total_timesteps=args.timesteps,
+                           run_dir=args.run_dir, checkpoint_every=args.checkpoint_every,
+                           resume=args.resume, normalize=args.normalize)
+
+    # One episode on a single env (the one the policy was trained on) as a sanity check
+    env = load_class(args.env)(**env_kwargs)
+    obs, _ = env.reset()
+    done, total = False, 0.0
+    while not done:
+        action, _ = policy.predict(obs)
+        obs, reward, terminated, truncated, _ = env.step(action)
+        total += reward
+        done = terminated or truncated
+    print(f"Episode reward: {total:.2f}")
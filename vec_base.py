@@ -0,0 +1,164 @@
+import numpy as np # type: ignore
+from gymnasium.utils import seeding # type: ignore
+from stable_baselines3.common.vec_env import VecEnv # type: ignore
+
+class BatchedVecEnv(VecEnv):
+    """
+    Shared plumbing for natively vectorized envs: all lanes live in (N, ...)
+    arrays inside one object. Subclasses set up their arrays and call
+    super().__init__(num_envs, observation_space, action_space), then provide
+    _reset_lanes(lanes), _step_lanes(actions) -> (reward, dones) and _get_obs().
+    step_wait auto-resets finished lanes and reports info['terminal_observation']
+    like DummyVecEnv.
+    """
+    render_mode = None
+
+    def reset(self):
+        self._reset_lanes(np.arange(self.num_envs))
+        self._reset_seeds()
+        self._reset_options()
+        self.reset_infos = [{} for _ in range(self.num_envs)]
+        return self._get_obs()
+
+    def step_async(self, actions):
+        self.actions = np.asarray(actions)
+
+    def step_wait(self):
+        reward, dones = self._step_lanes(self.actions)
+
+        obs = self._get_obs()
+        infos = [{} for _ in range(self.num_envs)]
+        finished = np.flatnonzero(dones)
+        for i in finished:
+            infos[i]["terminal_observation"] = obs[i].copy()
+            infos[i]["TimeLimit.truncated"] = False
+        if finished.size:
+            self._reset_lanes(finished)
+            obs[finished] = self._get_obs()[finished]
+        return obs, reward.astype(np.float32), dones, infos
+
+    def close(self):
+        pass
+
+    def _lanes(self, indices):
+        if indices is None:
+            return range(self.num_envs)
+        if isinstance(indices, int):
+            return [indices]
+        return indices
+
+    def _per_lane(self, value, indices):
+        """Splits (N, ...) arrays into one entry per requested lane; anything else is shared."""
+        per_lane = isinstance(value, np.ndarray) and value.shape[:1] == (self.num_envs,)
+        return [value[i] if per_lane else value for i in self._lanes(indices)]
+
+    def get_attr(self, attr_name, indices=None):
+        return self._per_lane(getattr(self, attr_name), indices)
+
+    def set_attr(self, attr_name, value, indices=None):
+        current = getattr(self, attr_name)
+        if isinstance(current, np.ndarray) and current.shape[:1] == (self.num_envs,):
+            for i in self._lanes(indices):
+                current[i] = value
+        else:
+            setattr(self, attr_name, value)
+
+    def env_method(self, method_name, *method_args, indices=None, **method_kwargs):
+        """
+        There are no per-lane env objects: the method is called once on this
+        batched env, and its result is split per lane like get_attr.
+        """
+        return self._per_lane(getattr(self, method_name)(*method_args, **method_kwargs), indices)
+
+    def env_is_wrapped(self, wrapper_class, indices=None):
+        return [False for _ in self._lanes(indices)]
+
+class BatchedFurnaceVecEnv(BatchedVecEnv):
+    """
+    Batched furnace: per-lane temperature, (precursor, target, impurity) state
+    and step counter, with the control rules, time axis and temperature range
+    copied from the scalar reference env `ref` (single source of truth).
+    Subclasses add their kinetics constants, _reset_lanes and _advance().
+    """
+    def __init__(self, num_envs, ref):
+        self.integrator = ref.integrator
+        self.dt = ref.dt
+        self.max_time = ref.max_time
+        self.temp_step = ref.temp_step
+        self.temp_min, self.temp_max = ref.temp_min, ref.temp_max
+
+        self.temp = np.zeros(num_envs)
+        self.state = np.zeros((num_envs, 3))
+        self.time_step = np.zeros(num_envs, dtype=np.int64)
+        self.rngs = [None] * num_envs
+        self.actions = None
+        super().__init__(num_envs, ref.observation_space, ref.action_space)
+
+    def _lane_rng(self, i):
+        """Lane i's generator, reseeded when a seed is pending (like the scalar reset)."""
+        if self._seeds[i] is not None or self.rngs[i] is None:
+            self.rngs[i], _ = seeding.np_random(self._seeds[i])
+        return self.rngs[i]
+
+    def _start_temp(self, i, drawn):
+        """options={'temp': T} overrides the random start, after the draw (same order as the scalar reset)."""
+        if self._options[i] and 'temp' in self._options[i]:
+            return float(self._options[i]['temp'])
+        return drawn
+
+    def _step_lanes(self, actions):
+        self._apply_actions(actions.reshape(self.num_envs))
+        return self._advance()
+
+    def _apply_actions(self, a):
+        # 1. Control System (same +/- temp_step and clip as the scalar env)
+        temp = np.where(a == 0, self.temp - self.temp_step, np.where(a == 2, self.temp + self.temp_step, self.temp))
+        self.temp = np.clip(temp, self.temp_min, self.temp_max)
+
+    def run_schedule(self, recipes, temperatures=False):
+        """
+        Open-loop evaluation from the lanes' current (freshly reset) state.
+        `recipes` is (num_envs, horizon): actions (0=cool, 1=hold, 2=heat), or with
+        temperatures=True the furnace temperature (K) held during each interval,
+        clipped to the furnace range but not ramp-limited.
+        Lanes do not auto-reset. Returns final yield, impurity and summed reward.
+        """
+        recipes = np.asarray(recipes)
+        if recipes.shape[0] != self.num_envs or recipes.shape[1] > self.max_time:
+            raise ValueError(f"recipes must be ({self.num_envs}, <= {self.max_time}), got {recipes.shape}")
+        total = np.zeros(self.num_envs)
+        for column in recipes.T:
+            if temperatures:
+                self.temp = np.clip(column.astype(np.float64), self.temp_min, self.temp_max)
+            else:
+                self._apply_actions(column)
+            reward, _ = self._advance()
+            total += reward
+        return {'yield': self.state[:, 1].copy(), 'impurity': self.state[:, 2].copy(), 'reward': total}
+
+    @classmethod
+    def evaluate_recipes(cls, recipes, temperatures=False, start_temp=None, seed=None, **env_kwargs):
+        """
+        Scores many open-loop schedules at once with this furnace's physics.
+        `recipes`: (num_recipes, horizon) actions or temperatures (see run_schedule).
+        `start_temp`: starting temperature(s) in K, scalar or (num_recipes,); if None
+        each recipe gets the env's random start, reproducible via `seed`.
+        `env_kwargs` go to the env (integrator, control_interval, ...).
+        Returns {'yield', 'impurity', 'reward'} arrays of shape (num_recipes,).
+        """
+        recipes = np.asarray(recipes)
+        env = cls(len(recipes), **env_kwargs)
+        env.seed(seed)
+        if start_temp is not None:
+            starts = np.broadcast_to(np.asarray(start_temp, dtype=np.float64), (len(recipes),))
+            env.set_options([{'temp': t} for t in starts])
+        env.reset()
+        return env.run_schedule(recipes, temperatures=temperatures)
+
+    def _get_obs(self):
+        return np.stack([
+            self.temp / self.temp_max,
+            self.state[:, 1],
+            self.state[:, 2],
+            self.time_step / self.max_time
+        ], axis=1).astype(np.float32)